@@ -4,7 +4,7 @@
 """
 
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, ShardSessions
 from typing import Generator
 
 def get_db() -> Generator[Session, None, None]:
@@ -25,6 +25,22 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_shards() -> Generator[ShardSessions, None, None]:
+    """
+    جلسات الـ shards للطلب (تُفتح كل جلسة عند أول استخدام)
+    
+    الاستخدام:
+        @router.get("/users/{user_id}")
+        def read_user(user_id: int, shards: ShardSessions = Depends(get_shards)):
+            db = shards.for_user_id(user_id)
+    """
+    shards = ShardSessions()
+    try:
+        yield shards
+    finally:
+        shards.close()
+
+
 # === دالة تحقق من التوكن (للمستقبل) ===
 # def get_current_user(
 #     token: str = Depends(oauth2_scheme),
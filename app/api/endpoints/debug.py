@@ -0,0 +1,98 @@
+# app/api/endpoints/debug.py
+"""
+نقاط اتصال التشخيص (تُسجَّل فقط عند تفعيل PROFILING_ENABLED)
+
+جميعها تتطلب الترويسة X-Admin-Token بقيمة PROFILING_TOKEN.
+"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import asyncio
+import hmac
+
+from app import schemas
+from app.core.config import settings
+from app.core.profiling import SamplingProfiler, memory_tracer, profile_store
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    التحقق من توكن المسؤول
+    """
+    if not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode(), settings.PROFILING_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="ليس لديك صلاحية الوصول"
+        )
+
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+# ======================
+# 1. معاينة العملية كاملة
+# ======================
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_process(seconds: float = 5.0):
+    """
+    معاينة جميع الخيوط لمدة seconds ثانية
+    
+    الرد: collapsed stacks (نص) لأدوات flamegraph
+    """
+    seconds = max(0.1, min(seconds, settings.PROFILING_MAX_SECONDS))
+    profiler = SamplingProfiler(settings.PROFILING_INTERVAL_MS / 1000).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler.collapsed()
+
+
+# ======================
+# 2. معاينة طلب محدد
+# ======================
+@router.get("/profile/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(profile_id: str):
+    """
+    معاينة طلب سابق أُرسل مع الترويسة X-Profile (المعرف من X-Profile-Id)
+    """
+    collapsed = profile_store.get(profile_id)
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="المعاينة غير موجودة"
+        )
+    return collapsed
+
+
+# ======================
+# 3. تتبع الذاكرة
+# ======================
+@router.get("/memory", response_model=schemas.ApiResponse)
+async def memory_diff(limit: int = 20, stop: bool = False):
+    """
+    أكبر مواقع تخصيص الذاكرة تغيراً منذ الطلب السابق (tracemalloc)
+    
+    المعاملات:
+    - limit (اختياري): عدد المواقع (الافتراضي 20)
+    - stop (اختياري): إيقاف التتبع وإزالة تكلفته
+    
+    أول طلب يبدأ التتبع ويأخذ اللقطة الأساسية فقط.
+    """
+    if stop:
+        memory_tracer.stop()
+        return {
+            "success": True,
+            "message": "تم إيقاف تتبع الذاكرة",
+            "data": {"tracing": False}
+        }
+    
+    data = await asyncio.to_thread(memory_tracer.diff, max(1, min(limit, 200)))
+    return {
+        "success": True,
+        "message": "تم بدء تتبع الذاكرة" if data["started"] else "فروقات الذاكرة منذ اللقطة السابقة",
+        "data": data
+    }
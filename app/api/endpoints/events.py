@@ -0,0 +1,118 @@
+# app/api/endpoints/events.py
+"""
+نقاط اتصال البث المباشر للأحداث (بديل عن الاستعلام الدوري من لوحة التحكم)
+
+الأحداث: user.registered, user.status_changed, users.status_bulk,
+user.deleted, stats.delta, stream.reset
+"""
+
+from fastapi import APIRouter, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+
+from app.core.config import settings
+from app.core.events import broadcaster
+
+router = APIRouter()
+
+
+def _parse_event_id(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# ======================
+# 1. البث عبر Server-Sent Events
+# ======================
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    بث الأحداث بصيغة text/event-stream
+    
+    المعاملات:
+    - Last-Event-ID (ترويسة) أو last_event_id (اختياري): لاستئناف البث
+    """
+    subscriber = broadcaster.subscribe(
+        _parse_event_id(last_event_id_header or last_event_id)
+    )
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                
+                # تم فصل المشترك لبطئه، يعيد العميل الاتصال تلقائياً
+                if event is None:
+                    break
+                
+                event_id, event_type, data = event
+                message = f"event: {event_type}\ndata: {data}\n\n"
+                if event_id is not None:
+                    message = f"id: {event_id}\n" + message
+                yield message
+        finally:
+            broadcaster.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ======================
+# 2. البث عبر WebSocket
+# ======================
+@router.websocket("/events/ws")
+async def websocket_events(websocket: WebSocket, last_event_id: Optional[str] = None):
+    """
+    نفس الأحداث عبر WebSocket كرسائل JSON: {"id", "event", "data"}
+    """
+    await websocket.accept()
+    subscriber = broadcaster.subscribe(_parse_event_id(last_event_id))
+    # انتظار رسائل العميل بالتوازي لاكتشاف قطع الاتصال دون انتظار حدث جديد
+    receive = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            get = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({get, receive}, return_when=asyncio.FIRST_COMPLETED)
+            
+            if get not in done:
+                get.cancel()
+            else:
+                event = get.result()
+                if event is None:
+                    await websocket.close(code=1013)
+                    break
+                event_id, event_type, data = event
+                await websocket.send_text(
+                    f'{{"id": {"null" if event_id is None else event_id}, '
+                    f'"event": "{event_type}", "data": {data}}}'
+                )
+            
+            if receive in done:
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                receive = asyncio.ensure_future(websocket.receive())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receive.cancel()
+        broadcaster.unsubscribe(subscriber)
@@ -0,0 +1,166 @@
+# app/api/endpoints/review_queue.py
+"""
+نقاط اتصال API لقائمة مراجعة الطلبات المعلقة (لعدة مشرفين)
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app import schemas, crud
+from app.api.dependencies import get_shards
+from app.core.config import settings
+from app.database import ShardSessions
+
+router = APIRouter()
+
+
+def _lease_seconds(requested):
+    """
+    مدة الحجز المطلوبة ضمن الحد الأقصى المسموح
+    """
+    if requested is None:
+        return settings.REVIEW_LEASE_SECONDS
+    return min(requested, settings.REVIEW_MAX_LEASE_SECONDS)
+
+
+# ======================
+# 1. حجز الطلبات التالية
+# ======================
+@router.post("/review-queue/claim", response_model=schemas.ApiResponse)
+async def claim_next_users(
+    claim_data: schemas.ReviewClaimRequest,
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    حجز أقدم الطلبات المعلقة غير المحجوزة للمشرف (عبر كل الـ shards)
+    
+    المعاملات:
+    - moderator (مطلوب): اسم المشرف
+    - count (اختياري): عدد الطلبات (1-100، الافتراضي 10)
+    - lease_seconds (اختياري): مدة الحجز بالثواني
+    
+    الرد:
+    - data: الطلبات المحجوزة ووقت انتهاء الحجز
+    """
+    try:
+        users = await crud.ShardCRUD.claim_review(
+            shards,
+            claim_data.moderator,
+            claim_data.count,
+            _lease_seconds(claim_data.lease_seconds)
+        )
+        
+        users_list = []
+        for user in users:
+            user_dict = {
+                "id": user.id,
+                "name": user.name,
+                "email": user.email,
+                "phone": user.phone,
+                "status": user.status,
+                "created_at": user.created_at.isoformat() if user.created_at else None,
+                "claim_expires_at": user.claim_expires_at.isoformat() if user.claim_expires_at else None
+            }
+            users_list.append(user_dict)
+        
+        return {
+            "success": True,
+            "message": f"تم حجز {len(users_list)} طلب للمراجعة",
+            "data": {
+                "users": users_list,
+                "moderator": claim_data.moderator,
+                "count": len(users_list)
+            }
+        }
+        
+    except Exception as e:
+        shards.rollback()
+        print(f"❌ خطأ في حجز الطلبات: {str(e)}")
+        return {
+            "success": False,
+            "message": f"حدث خطأ: {str(e)}",
+            "status": "error",
+            "data": None
+        }
+
+
+# ======================
+# 2. تمديد الحجز
+# ======================
+@router.post("/review-queue/renew", response_model=schemas.ApiResponse)
+async def renew_claims(
+    lease_data: schemas.ReviewLeaseRequest,
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    تمديد حجز طلبات ما زالت محجوزة لنفس المشرف
+    
+    الرد:
+    - data: المعرفات التي تم تمديدها (الحجوزات المنتهية لا تُمدد)
+    """
+    try:
+        renewed = await crud.ShardCRUD.renew_review(
+            shards,
+            lease_data.moderator,
+            lease_data.user_ids,
+            _lease_seconds(lease_data.lease_seconds)
+        )
+        
+        return {
+            "success": True,
+            "message": f"تم تمديد حجز {len(renewed)} طلب",
+            "data": {
+                "renewed": renewed,
+                "lost": [user_id for user_id in lease_data.user_ids if user_id not in renewed]
+            }
+        }
+        
+    except Exception as e:
+        shards.rollback()
+        print(f"❌ خطأ في تمديد الحجز: {str(e)}")
+        return {
+            "success": False,
+            "message": f"حدث خطأ: {str(e)}",
+            "status": "error",
+            "data": None
+        }
+
+
+# ======================
+# 3. إلغاء الحجز
+# ======================
+@router.post("/review-queue/release", response_model=schemas.ApiResponse)
+async def release_claims(
+    lease_data: schemas.ReviewLeaseRequest,
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    إعادة طلبات محجوزة إلى القائمة دون اتخاذ قرار
+    
+    الرد:
+    - data: المعرفات التي تم إلغاء حجزها
+    """
+    try:
+        released = await crud.ShardCRUD.release_review(
+            shards,
+            lease_data.moderator,
+            lease_data.user_ids
+        )
+        
+        return {
+            "success": True,
+            "message": f"تم إلغاء حجز {len(released)} طلب",
+            "data": {
+                "released": released
+            }
+        }
+        
+    except Exception as e:
+        shards.rollback()
+        print(f"❌ خطأ في إلغاء الحجز: {str(e)}")
+        return {
+            "success": False,
+            "message": f"حدث خطأ: {str(e)}",
+            "status": "error",
+            "data": None
+        }
@@ -1,19 +1,28 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from app import schemas, crud
-from app.api.dependencies import get_db
+from app.api.dependencies import get_shards
+from app.core.cache import user_cache
+from app.core.suggest import suggest_index
+from app.database import ShardSessions
 
 router = APIRouter()
 
+# الحد الأقصى لعدد الفترات في طلب السلسلة الزمنية الواحد
+MAX_TIMESERIES_BUCKETS = 5000
+BUCKET_SIZES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
 @router.get("/stats", response_model=schemas.ApiResponse)
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(shards: ShardSessions = Depends(get_shards)):
     """
     الحصول على الإحصائيات - مطابق للواجهة الأمامية
     """
-    stats = crud.StatsCRUD.get_stats(db)
+    stats, total_users = await crud.ShardCRUD.get_stats(shards)
     
     response_data = {
-        "total_users": stats.total_users,
+        "total_users": total_users,
         "today_visits": stats.today_visits,
         "countries_count": stats.countries_count,
         "last_updated": stats.last_updated.isoformat()
@@ -28,13 +37,13 @@ async def get_statistics(db: Session = Depends(get_db)):
 @router.put("/stats/update", response_model=schemas.ApiResponse)
 async def update_statistics(
     stats_data: schemas.StatsResponse,
-    db: Session = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     تحديث الإحصائيات (للمسؤولين)
     """
-    updated_stats = crud.StatsCRUD.update_stats(
-        db,
+    updated_stats, total_users = await crud.ShardCRUD.update_stats(
+        shards,
         total_users=stats_data.total_users,
         today_visits=stats_data.today_visits,
         countries_count=stats_data.countries_count
@@ -43,5 +52,100 @@ async def update_statistics(
     return {
         "success": True,
         "message": "تم تحديث الإحصائيات بنجاح",
-        "data": updated_stats
-    }
\ No newline at end of file
+        "data": {
+            "id": updated_stats.id,
+            "total_users": total_users,
+            "today_visits": updated_stats.today_visits,
+            "countries_count": updated_stats.countries_count,
+            "last_updated": updated_stats.last_updated
+        }
+    }
+
+@router.get("/stats/timeseries", response_model=schemas.ApiResponse)
+async def get_registrations_timeseries(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    bucket: str = "hour",
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    عدد التسجيلات لكل ساعة أو يوم مقسّمة حسب الحالة (من جداول التجميع)
+    
+    المعاملات:
+    - from (اختياري): بداية الفترة (الافتراضي: قبل 24 ساعة أو 30 يوماً)
+    - to (اختياري): نهاية الفترة غير شاملة (الافتراضي: الآن)
+    - bucket (اختياري): hour أو day (الافتراضي hour)
+    
+    الرد بصيغة عمودية: timestamps مع مصفوفة أعداد لكل حالة
+    """
+    if bucket not in BUCKET_SIZES:
+        return {
+            "success": False,
+            "message": "قيمة bucket غير صالحة. يجب أن تكون: hour, day",
+            "status": "error",
+            "data": None
+        }
+    
+    end = to or datetime.now(timezone.utc)
+    start = from_ or end - (BUCKET_SIZES[bucket] * (24 if bucket == "hour" else 30))
+    if start.tzinfo is None and end.tzinfo is not None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None and start.tzinfo is not None:
+        end = end.replace(tzinfo=timezone.utc)
+    
+    if start >= end:
+        return {
+            "success": False,
+            "message": "يجب أن تكون from قبل to",
+            "status": "error",
+            "data": None
+        }
+    
+    if (end - start) / BUCKET_SIZES[bucket] > MAX_TIMESERIES_BUCKETS:
+        return {
+            "success": False,
+            "message": f"الفترة طويلة جداً. الحد الأقصى {MAX_TIMESERIES_BUCKETS} فترة",
+            "status": "error",
+            "data": None
+        }
+    
+    series = await crud.ShardCRUD.timeseries(shards, start, end, bucket)
+    
+    return {
+        "success": True,
+        "message": f"تم جلب {len(series['timestamps'])} فترة",
+        "data": series
+    }
+
+@router.get("/stats/cache", response_model=schemas.ApiResponse)
+async def get_cache_statistics():
+    """
+    إحصائيات ذاكرة سجلات المستخدمين المؤقتة (نسبة الإصابة والذاكرة)
+    """
+    return {
+        "success": True,
+        "message": "إحصائيات الذاكرة المؤقتة",
+        "data": user_cache.stats()
+    }
+
+@router.get("/stats/suggest", response_model=schemas.ApiResponse)
+async def get_suggest_statistics():
+    """
+    حالة فهرس الإكمال التلقائي: عدد المفاتيح والذاكرة ومدة آخر إعادة بناء
+    """
+    return {
+        "success": True,
+        "message": "إحصائيات فهرس الإكمال التلقائي",
+        "data": suggest_index.stats()
+    }
+
+@router.get("/stats/outbox", response_model=schemas.ApiResponse)
+async def get_outbox_statistics(shards: ShardSessions = Depends(get_shards)):
+    """
+    عدد أحداث صندوق الصادر حسب المعالج والحالة (pending, done, failed) في كل الـ shards
+    """
+    return {
+        "success": True,
+        "message": "حالة صندوق الصادر",
+        "data": await crud.ShardCRUD.outbox_counts(shards)
+    }
@@ -3,25 +3,66 @@
 نقاط اتصال API لإدارة المستخدمين والتسجيل
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+import csv
+import io
+import time
 import uuid
 
 from app import schemas, crud, models
-from app.api.dependencies import get_db
+from app.api.dependencies import get_shards
+from app.core.cache import UserRecord
+from app.core.config import settings
+from app.core.suggest import suggest_index
+from app.database import ShardSessions
 
 router = APIRouter()
 
+# الحقول الافتراضية عند عدم تحديد fields=
+LIST_DEFAULT_FIELDS = ("id", "name", "email", "phone", "status", "is_active", "created_at")
+SEARCH_DEFAULT_FIELDS = ("id", "name", "email", "phone", "status")
+
+
+def parse_fields(fields: Optional[str], default: tuple):
+    """
+    تحليل fields= (أسماء مفصولة بفواصل) وإرجاع None إذا كان فيها حقل غير معروف
+    """
+    if not fields:
+        return default
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    if not requested or any(field not in crud.USER_FIELDS for field in requested):
+        return None
+    return requested
+
+
+def export_csv(fields: tuple, status: Optional[str]):
+    """
+    أسطر CSV لكل المستخدمين (من الأحدث) على دفعات من 1000 صف
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for i, row in enumerate(crud.ShardCRUD.export_rows(fields, status), 1):
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        if i % 1000 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
 # ======================
 # 1. نقطة التسجيل الرئيسية
 # ======================
 @router.post("/register", response_model=schemas.ApiResponse)
 async def register_user(
     user_data: schemas.UserCreate,
-    db: Session = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     تسجيل مستخدم جديد - مطابق تماماً للواجهة الأمامية
@@ -50,69 +91,44 @@ async def register_user(
                 "data": None
             }
         
-        # ========== التحقق من وجود المستخدم ==========
-        existing_user = db.query(models.User).filter(
-            models.User.email == user_data.email
-        ).first()
+        # المستخدم يُحفظ في shard دلو بريده
+        db = shards.for_email(user_data.email)
         
-        if existing_user:
+        # ========== إنشاء المستخدم ==========
+        print(f"🆕 إنشاء مستخدم جديد: {user_data.name}")
+        
+        # مسار الكتابة الوحيد للتسجيل (crud.UserCRUD.create_user): المعرف، سجل
+        # البريد، التجميعات، صندوق الصادر، العدادات، فهرس الإكمال والبث المباشر
+        db_user = crud.UserCRUD.create_user(db, user_data)
+        
+        # ========== البريد مسجل مسبقاً (في الجدول أو الأرشيف) ==========
+        if db_user is None:
             return {
                 "success": False,
                 "message": "البريد الإلكتروني مسجل مسبقاً",
                 "status": "error",
                 "data": None
             }
+        record = UserRecord.from_user(db_user)
         
-        # ========== إنشاء المستخدم ==========
-        print(f"🆕 إنشاء مستخدم جديد: {user_data.name}")
-        
-        db_user = models.User(
-            name=user_data.name,
-            email=user_data.email,
-            phone=user_data.phone,
-            status="pending",  # الحالة الافتراضية
-            is_active=True
-        )
-        
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        
-        print(f"✅ تم إنشاء المستخدم برقم: {db_user.id}")
-        
-        # ========== تحديث الإحصائيات ==========
-        stats = db.query(models.RegistrationStats).first()
-        if stats:
-            stats.total_users += 1
-            stats.last_updated = datetime.now()
-            db.commit()
-            print(f"📊 تم تحديث الإحصائيات: {stats.total_users} مستخدم")
-        else:
-            # إنشاء إحصائيات جديدة إذا لم تكن موجودة
-            stats = models.RegistrationStats(
-                total_users=1,
-                today_visits=1,
-                countries_count=1
-            )
-            db.add(stats)
-            db.commit()
+        print(f"✅ تم إنشاء المستخدم برقم: {record.id}")
         
         # ========== إعداد الرد ==========
         response_data = {
-            "id": db_user.id,
-            "name": db_user.name,
-            "email": db_user.email,
-            "phone": db_user.phone,
-            "status": db_user.status,
+            "id": record.id,
+            "name": record.name,
+            "email": record.email,
+            "phone": record.phone,
+            "status": record.status,
             "message": "تم استلام طلبك بنجاح",
-            "user_id": f"USER-{db_user.id:06d}",
+            "user_id": f"USER-{record.id:06d}",
             "review_time": "24-48 ساعة",
             "timestamp": datetime.now().isoformat(),
             "note": "سيتم مراجعة طلبك من قبل الإدارة",
-            "created_at": db_user.created_at.isoformat() if db_user.created_at else None
+            "created_at": record.created_at
         }
         
-        print(f"📤 إرسال رد للمستخدم: {db_user.email}")
+        print(f"📤 إرسال رد للمستخدم: {record.email}")
         
         return {
             "success": True,
@@ -122,7 +138,7 @@ async def register_user(
         }
         
     except IntegrityError as e:
-        db.rollback()
+        shards.rollback()
         print(f"❌ خطأ في قاعدة البيانات: {str(e)}")
         return {
             "success": False,
@@ -132,7 +148,7 @@ async def register_user(
         }
         
     except Exception as e:
-        db.rollback()
+        shards.rollback()
         print(f"❌ خطأ غير متوقع: {str(e)}")
         return {
             "success": False,
@@ -149,41 +165,69 @@ async def register_user(
 async def get_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    status_filter: Optional[str] = Query(None, alias="status"),
+    count: str = "exact",
+    fields: Optional[str] = None,
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
-    الحصول على قائمة جميع المستخدمين
+    الحصول على قائمة جميع المستخدمين (من كل الـ shards مدموجة من الأحدث)
     
     المعاملات:
     - skip (اختياري): عدد السجلات لتخطيها (للترقيم)
     - limit (اختياري): الحد الأقصى للسجلات (الافتراضي 100)
+    - status (اختياري): تصفية حسب الحالة (pending, approved, rejected)
+    - count (اختياري): طريقة حساب الإجمالي
+      exact (من العدادات)، estimate (تقديري وسريع)، none (بدون إجمالي)
+    - fields (اختياري): الحقول المطلوبة مفصولة بفواصل، مثل id,name,status
     
     الرد:
-    - data: قائمة المستخدمين
+    - data: قائمة المستخدمين والإجمالي (total)
     """
+    selected_fields = parse_fields(fields, LIST_DEFAULT_FIELDS)
+    if selected_fields is None:
+        return {
+            "success": False,
+            "message": f"حقول غير صالحة. المسموح: {', '.join(crud.USER_FIELDS)}",
+            "status": "error",
+            "data": None
+        }
+    
+    if count not in ("exact", "estimate", "none"):
+        return {
+            "success": False,
+            "message": "قيمة count غير صالحة. يجب أن تكون: exact, estimate, none",
+            "status": "error",
+            "data": None
+        }
+    
+    if status_filter is not None and status_filter not in crud.USER_STATUSES:
+        return {
+            "success": False,
+            "message": "الحالة غير صالحة. يجب أن تكون: pending, approved, rejected",
+            "status": "error",
+            "data": None
+        }
+    
     try:
-        users = crud.UserCRUD.get_all_users(db, skip=skip, limit=limit)
-        
-        # تحويل المستخدمين إلى قاموس
-        users_list = []
-        for user in users:
-            user_dict = {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "phone": user.phone,
-                "status": user.status,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None
-            }
-            users_list.append(user_dict)
+        rows = await crud.ShardCRUD.list_rows(
+            shards, selected_fields, skip=skip, limit=limit, status=status_filter
+        )
+        
+        total = None
+        if count != "none":
+            total = await crud.ShardCRUD.count_users(shards, count, status_filter)
+        
+        # تحويل الصفوف إلى قواميس مباشرة (بدون كائنات ORM)
+        users_list = crud.UserCRUD.serialize_rows(selected_fields, rows)
         
         return {
             "success": True,
-            "message": f"تم العثور على {len(users)} مستخدم",
+            "message": f"تم العثور على {len(users_list)} مستخدم",
             "data": {
                 "users": users_list,
-                "total": len(users_list),
+                "total": total,
+                "count_mode": count,
                 "skip": skip,
                 "limit": limit
             }
@@ -197,13 +241,95 @@ async def get_users(
         )
 
 
+# ======================
+# 2ب. تصدير المستخدمين (قبل /users/{user_id} حتى لا يُطابق "export" كمعرف)
+# ======================
+@router.get("/users/export")
+async def export_users(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    fields: Optional[str] = None
+):
+    """
+    تصدير جميع المستخدمين بصيغة CSV (من الأحدث) مع البث التدريجي
+    
+    المعاملات:
+    - status (اختياري): تصفية حسب الحالة
+    - fields (اختياري): الحقول المطلوبة مفصولة بفواصل
+    """
+    selected_fields = parse_fields(fields, LIST_DEFAULT_FIELDS)
+    if selected_fields is None:
+        return {
+            "success": False,
+            "message": f"حقول غير صالحة. المسموح: {', '.join(crud.USER_FIELDS)}",
+            "status": "error",
+            "data": None
+        }
+    
+    if status_filter is not None and status_filter not in crud.USER_STATUSES:
+        return {
+            "success": False,
+            "message": "الحالة غير صالحة. يجب أن تكون: pending, approved, rejected",
+            "status": "error",
+            "data": None
+        }
+    
+    return StreamingResponse(
+        export_csv(selected_fields, status_filter),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": "attachment; filename=users.csv"}
+    )
+
+
+# ======================
+# 2ج. الإكمال التلقائي (قبل /users/{user_id})
+# ======================
+@router.get("/users/suggest", response_model=schemas.ApiResponse)
+async def suggest_users(
+    q: str = "",
+    limit: int = 10
+):
+    """
+    اقتراحات فورية أثناء الكتابة من فهرس في الذاكرة (بدون قاعدة البيانات)
+    
+    المعاملات:
+    - q (مطلوب): بداية الاسم أو البريد، وكل كلمة تطابق بداية كلمة
+    - limit (اختياري): عدد الاقتراحات (الافتراضي 10)
+    
+    الرد:
+    - data: الاقتراحات (id, name, email, status) ومدة البحث بالمللي ثانية
+    """
+    if not settings.SUGGEST_INDEX_ENABLED:
+        return {
+            "success": False,
+            "message": "الإكمال التلقائي غير مفعّل",
+            "status": "error",
+            "data": None
+        }
+    
+    started = time.perf_counter()
+    suggestions = suggest_index.suggest(q, max(0, min(limit, settings.SUGGEST_MAX_LIMIT)))
+    took_ms = (time.perf_counter() - started) * 1000
+    
+    return {
+        "success": True,
+        "message": f"{len(suggestions)} اقتراح",
+        "data": {
+            "query": q,
+            "results": [suggestion._asdict() for suggestion in suggestions],
+            "count": len(suggestions),
+            "ready": suggest_index.ready,
+            "took_ms": round(took_ms, 3)
+        }
+    }
+
+
 # ======================
 # 3. الحصول على مستخدم محدد
 # ======================
 @router.get("/users/{user_id}", response_model=schemas.ApiResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     الحصول على بيانات مستخدم محدد
@@ -215,9 +341,10 @@ async def get_user(
     - data: بيانات المستخدم
     """
     try:
-        user = crud.UserCRUD.get_user(db, user_id)
+        # الـ shard يُعرف من المعرف مباشرة
+        record = crud.UserCRUD.get_user_record(shards.for_user_id(user_id), user_id)
         
-        if not user:
+        if not record:
             return {
                 "success": False,
                 "message": f"المستخدم برقم {user_id} غير موجود",
@@ -225,21 +352,10 @@ async def get_user(
                 "data": None
             }
         
-        user_data = {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "phone": user.phone,
-            "status": user.status,
-            "is_active": user.is_active,
-            "created_at": user.created_at.isoformat() if user.created_at else None,
-            "updated_at": user.updated_at.isoformat() if user.updated_at else None
-        }
-        
         return {
             "success": True,
             "message": "تم العثور على المستخدم",
-            "data": user_data
+            "data": record.to_dict()
         }
         
     except Exception as e:
@@ -259,7 +375,7 @@ async def get_user(
 async def update_user_status(
     user_id: int,
     status_data: dict,
-    db: Session = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     تحديث حالة المستخدم (للمسؤولين)
@@ -290,7 +406,9 @@ async def update_user_status(
                 "data": None
             }
         
-        user = crud.UserCRUD.update_user_status(db, user_id, status_value)
+        user = crud.UserCRUD.update_user_status(
+            shards.for_user_id(user_id), user_id, status_value
+        )
         
         if not user:
             return {
@@ -330,38 +448,36 @@ async def update_user_status(
 @router.get("/users/search/{query}", response_model=schemas.ApiResponse)
 async def search_users(
     query: str,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
-    البحث عن مستخدمين بالاسم أو البريد الإلكتروني
+    البحث عن مستخدمين بالاسم أو البريد الإلكتروني (في كل الـ shards)
     
     المعاملات:
     - query (مطلوب): نص البحث
+    - fields (اختياري): الحقول المطلوبة مفصولة بفواصل، مثل id,name
     
     الرد:
     - data: نتائج البحث
     """
+    selected_fields = parse_fields(fields, SEARCH_DEFAULT_FIELDS)
+    if selected_fields is None:
+        return {
+            "success": False,
+            "message": f"حقول غير صالحة. المسموح: {', '.join(crud.USER_FIELDS)}",
+            "status": "error",
+            "data": None
+        }
+    
     try:
-        # البحث في قاعدة البيانات
-        users = db.query(models.User).filter(
-            (models.User.name.ilike(f"%{query}%")) |
-            (models.User.email.ilike(f"%{query}%"))
-        ).all()
-        
-        users_list = []
-        for user in users:
-            user_dict = {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "phone": user.phone,
-                "status": user.status
-            }
-            users_list.append(user_dict)
+        # البحث في كل الـ shards بالتوازي (الأعمدة المطلوبة فقط)
+        rows = await crud.ShardCRUD.search_rows(shards, query, selected_fields)
+        users_list = crud.UserCRUD.serialize_rows(selected_fields, rows)
         
         return {
             "success": True,
-            "message": f"تم العثور على {len(users)} نتيجة للبحث: {query}",
+            "message": f"تم العثور على {len(users_list)} نتيجة للبحث: {query}",
             "data": {
                 "results": users_list,
                 "query": query,
@@ -384,7 +500,7 @@ async def search_users(
 # ======================
 @router.get("/users/stats/summary", response_model=schemas.ApiResponse)
 async def get_users_stats(
-    db: Session = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     الحصول على إحصائيات تفصيلية عن المستخدمين
@@ -393,34 +509,14 @@ async def get_users_stats(
     - data: إحصائيات المستخدمين
     """
     try:
-        # إحصائيات حسب الحالة
-        pending_count = db.query(models.User).filter(
-            models.User.status == "pending"
-        ).count()
-        
-        approved_count = db.query(models.User).filter(
-            models.User.status == "approved"
-        ).count()
-        
-        rejected_count = db.query(models.User).filter(
-            models.User.status == "rejected"
-        ).count()
-        
-        # المستخدمين النشطين
-        active_count = db.query(models.User).filter(
-            models.User.is_active == True
-        ).count()
-        
-        # إجمالي المستخدمين
-        total_count = db.query(models.User).count()
-        
-        # المستخدمين الجدد اليوم
-        from datetime import date
-        today = date.today()
-        
-        today_count = db.query(models.User).filter(
-            models.User.created_at >= today
-        ).count()
+        # الأعداد من كل الـ shards بالتوازي ثم تُجمع
+        counts = await crud.ShardCRUD.summary_counts(shards)
+        pending_count = counts["pending"]
+        approved_count = counts["approved"]
+        rejected_count = counts["rejected"]
+        active_count = counts["active"]
+        total_count = counts["total"]
+        today_count = counts["today"]
         
         stats_data = {
             "total_users": total_count,
@@ -448,3 +544,93 @@ async def get_users_stats(
             "status": "error",
             "data": None
         }
+
+
+# ======================
+# 7. تحديث حالة مجموعة مستخدمين
+# ======================
+@router.post("/users/bulk-status", response_model=schemas.ApiResponse)
+async def bulk_update_user_status(
+    bulk_data: schemas.BulkStatusUpdate,
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    تحديث حالة عدة مستخدمين في طلب واحد (للمسؤولين)
+    
+    المعاملات:
+    - status (مطلوب): الحالة الجديدة (pending, approved, rejected)
+    - user_ids (اختياري): قائمة أرقام المستخدمين
+    - filter (اختياري): مرشح بدلاً من القائمة، مثل
+      {"status": "pending", "created_before": "2024-01-01T00:00:00"}
+    
+    الرد:
+    - data: عدد ومعرفات المستخدمين حسب النتيجة (updated, unchanged, not_found)
+    """
+    try:
+        if bulk_data.status not in crud.USER_STATUSES:
+            return {
+                "success": False,
+                "message": "الحالة غير صالحة. يجب أن تكون: pending, approved, rejected",
+                "status": "error",
+                "data": None
+            }
+        
+        if (bulk_data.user_ids is None) == (bulk_data.filter is None):
+            return {
+                "success": False,
+                "message": "يجب تحديد user_ids أو filter (أحدهما فقط)",
+                "status": "error",
+                "data": None
+            }
+        
+        current_status = None
+        created_before = None
+        if bulk_data.filter is not None:
+            current_status = bulk_data.filter.status
+            created_before = bulk_data.filter.created_before
+            
+            if current_status is None and created_before is None:
+                return {
+                    "success": False,
+                    "message": "المرشح يجب أن يحتوي على status أو created_before",
+                    "status": "error",
+                    "data": None
+                }
+            
+            if current_status is not None and current_status not in crud.USER_STATUSES:
+                return {
+                    "success": False,
+                    "message": "حالة المرشح غير صالحة. يجب أن تكون: pending, approved, rejected",
+                    "status": "error",
+                    "data": None
+                }
+        
+        results = await crud.ShardCRUD.bulk_update_status(
+            shards,
+            bulk_data.status,
+            user_ids=bulk_data.user_ids,
+            current_status=current_status,
+            created_before=created_before
+        )
+        
+        return {
+            "success": True,
+            "message": f"تم تحديث حالة {len(results['updated'])} مستخدم إلى: {bulk_data.status}",
+            "data": {
+                "status": bulk_data.status,
+                "updated": len(results["updated"]),
+                "unchanged": len(results["unchanged"]),
+                "not_found": len(results["not_found"]),
+                "results": results
+            }
+        }
+        
+    except Exception as e:
+        shards.rollback()
+        print(f"❌ خطأ في التحديث الجماعي للحالة: {str(e)}")
+        return {
+            "success": False,
+            "message": f"حدث خطأ: {str(e)}",
+            "status": "error",
+            "data": None
+        }
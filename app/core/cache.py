@@ -0,0 +1,174 @@
+# app/core/cache.py
+"""
+ذاكرة تخزين مؤقت (LRU) لسجلات المستخدمين داخل العملية
+
+تُخزَّن السجلات بصيغة مضغوطة غير قابلة للتعديل (namedtuple) تحتوي فقط على
+الحقول المُرسلة في الرد، بدلاً من كائنات ORM الكاملة.
+ملاحظة: الذاكرة خاصة بكل عملية، والإبطال يتم محلياً فقط.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+import time
+from typing import NamedTuple, Optional
+import sys
+
+from app.core.config import settings
+
+
+class UserRecord(NamedTuple):
+    id: int
+    name: str
+    email: str
+    phone: Optional[str]
+    status: str
+    is_active: bool
+    created_at: Optional[str]
+    updated_at: Optional[str]
+    
+    @classmethod
+    def from_row(cls, row):
+        """
+        إنشاء سجل من صف قاعدة البيانات (التواريخ تُحوَّل إلى ISO مرة واحدة)
+        """
+        values = []
+        for value in row:
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return cls(*values)
+    
+    @classmethod
+    def from_user(cls, user):
+        """
+        إنشاء سجل من كائن User
+        """
+        return cls.from_row(getattr(user, field) for field in cls._fields)
+    
+    def to_dict(self):
+        return dict(self._asdict())
+
+
+class UserRecordCache:
+    """
+    ذاكرة LRU محدودة الحجم لسجلات المستخدمين
+    
+    كل إبطال يزيد رقم الجيل (generation)، والقارئ الذي بدأ التحميل من
+    قاعدة البيانات قبل إبطال ما لا يُخزّن نتيجته، حتى لا تعود بيانات قديمة.
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.generation = 0
+        self._records = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, user_id: int) -> Optional[UserRecord]:
+        with self._lock:
+            record = self._records.get(user_id)
+            if record is None:
+                self.misses += 1
+                return None
+            self._records.move_to_end(user_id)
+            self.hits += 1
+            return record
+    
+    def put(self, record: UserRecord, generation: int):
+        """
+        تخزين سجل تم تحميله عندما كان رقم الجيل = generation
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._records[record.id] = record
+            self._records.move_to_end(record.id)
+            while len(self._records) > self.maxsize:
+                self._records.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, *user_ids: int):
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                if self._records.pop(user_id, None) is not None:
+                    self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._records.clear()
+    
+    def memory_bytes(self) -> int:
+        """
+        تقدير تقريبي للذاكرة: القاموس + السجلات + النصوص داخلها
+        """
+        with self._lock:
+            records = list(self._records.values())
+            total = sys.getsizeof(self._records)
+        for record in records:
+            total += sys.getsizeof(record)
+            for value in record:
+                if isinstance(value, str):
+                    total += sys.getsizeof(value)
+        return total
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._records),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+class CountCache:
+    """
+    أعداد تقديرية لكل مرشح لمدة ttl_seconds، تُبطَل عند الكتابة على نفس المرشح
+    
+    لكل مفتاح رقم جيل خاص به، فالكتابة على مرشح (مثل total مع كل تسجيل)
+    لا تمنع تخزين COUNT(*) الجاري لمرشح آخر.
+    """
+    
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._generations = {}
+        self._counts = {}
+        self._lock = Lock()
+    
+    def generation(self, key: str) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+    
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                return None
+            return entry[0]
+    
+    def put(self, key: str, value: int, generation: int):
+        with self._lock:
+            if generation == self._generations.get(key, 0):
+                self._counts[key] = (value, time.monotonic() + self.ttl_seconds)
+    
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._counts.pop(key, None)
+
+
+user_cache = UserRecordCache(settings.USER_CACHE_SIZE)
+count_cache = CountCache(settings.COUNT_CACHE_SECONDS)
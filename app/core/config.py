@@ -10,6 +10,11 @@ class Settings(BaseSettings):
     # قاعدة البيانات
     DATABASE_URL: str = "sqlite:///./registration.db"
     
+    # قواعد بيانات الـ shards (أولها الرئيسية)، مثل:
+    # SHARD_URLS='["sqlite:///./shard0.db", "sqlite:///./shard1.db"]'
+    # فارغة = shard واحد هو DATABASE_URL
+    SHARD_URLS: List[str] = []
+    
     # إعدادات CORS للتوافق مع Netlify
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -18,6 +23,61 @@ class Settings(BaseSettings):
         "*"
     ]
     
+    # قائمة المراجعة: مدة حجز الطلبات للمشرف (بالثواني)
+    REVIEW_LEASE_SECONDS: int = 300
+    REVIEW_MAX_LEASE_SECONDS: int = 3600
+    
+    # عدد سجلات المستخدمين في الذاكرة المؤقتة (0 لتعطيلها)
+    USER_CACHE_SIZE: int = 10000
+    
+    # مدة صلاحية الأعداد التقديرية لقوائم المستخدمين (بالثواني)
+    COUNT_CACHE_SECONDS: float = 60.0
+    
+    # البث المباشر للأحداث (SSE / WebSocket)
+    EVENTS_HISTORY_SIZE: int = 1000
+    EVENTS_QUEUE_SIZE: int = 256
+    EVENTS_COALESCE_SECONDS: float = 1.0
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    
+    # صندوق الصادر وعمال المهام اللاحقة للتسجيل
+    OUTBOX_HANDLERS: List[str] = ["stats"]  # المتاح: stats, email, webhook
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_SECONDS: float = 1.0
+    # مهلة حجز الحدث، تتجدد لبقية الدفعة بعد مرور نصفها، لذا يجب أن يتجاوز
+    # نصفها زمن معالج واحد (SMTP حتى 10 ثوانٍ، webhook حتى WEBHOOK_TIMEOUT_SECONDS لكل رابط)
+    OUTBOX_LEASE_SECONDS: int = 60
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_SECONDS: float = 2.0
+    OUTBOX_MAX_BACKOFF_SECONDS: float = 600.0
+    
+    # البريد الإلكتروني (خادم SMTP محلي للتطوير، مثل: python -m aiosmtpd -n -l localhost:1025)
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 1025
+    SMTP_SENDER: str = "no-reply@registration.local"
+    
+    # روابط Webhook تُرسل لها أحداث التسجيل
+    WEBHOOK_URLS: List[str] = []
+    WEBHOOK_TIMEOUT_SECONDS: float = 5.0
+    
+    # أرشفة المستخدمين: كل ARCHIVE_INTERVAL_SECONDS (0 للتعطيل) تُنقل الصفوف
+    # غير النشطة ومن تم البت فيها قبل ARCHIVE_AFTER_DAYS يوماً إلى users_archive
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_CHUNK_SIZE: int = 500
+    
+    # فهرس الإكمال التلقائي في الذاكرة (GET /api/users/suggest)، يُبنى عند البدء
+    SUGGEST_INDEX_ENABLED: bool = True
+    SUGGEST_LOAD_CHUNK_SIZE: int = 5000
+    SUGGEST_MAX_LIMIT: int = 50
+    
+    # أدوات التشخيص (/debug) ومعاينة الطلبات بالترويسة X-Profile
+    # معطلة افتراضياً ولا تُضاف للتطبيق إلا مع PROFILING_TOKEN
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_SECONDS: int = 60
+    
     # إعدادات الأمان
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
@@ -0,0 +1,152 @@
+# app/core/events.py
+"""
+موزّع الأحداث داخل العملية (pub/sub) لتغذية لوحة التحكم المباشرة
+
+- كل مشترك له طابور محدود الحجم، والمشترك البطيء الذي يمتلئ طابوره يُفصل
+  ويعيد الاتصال مع Last-Event-ID.
+- آخر الأحداث محفوظة في مخزن دائري لاستئناف البث بعد انقطاع الاتصال.
+- فروقات الإحصائيات تُجمع خلال نافذة قصيرة وتُرسل كحدث واحد.
+"""
+
+from collections import Counter, deque
+from typing import Optional
+import asyncio
+import json
+
+from app.core.config import settings
+
+
+class Subscriber:
+    __slots__ = ("queue",)
+    
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+
+class EventBroadcaster:
+    def __init__(self, history_size: int, queue_size: int, coalesce_seconds: float):
+        self.queue_size = queue_size
+        self.coalesce_seconds = coalesce_seconds
+        self._loop = None
+        self._subscribers = set()
+        self._history = deque(maxlen=history_size)
+        self._next_id = 1
+        self._stats_delta = Counter()
+        self._stats_flush = None
+        self.dropped = 0
+    
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """
+        ربط الموزّع بحلقة الأحداث (عند بدء التطبيق)
+        """
+        self._loop = loop
+    
+    # ========== النشر ==========
+    
+    def publish(self, event_type: str, data: dict):
+        """
+        نشر حدث لجميع المشتركين (آمن للاستدعاء من أي خيط)
+        """
+        self._call(self._dispatch, event_type, data)
+    
+    def publish_stats_delta(self, total_users: int = 0, by_status: Optional[dict] = None):
+        """
+        إضافة فرق إحصائيات يُرسل مجمّعاً بعد coalesce_seconds
+        """
+        delta = Counter({"total_users": total_users})
+        for status, count in (by_status or {}).items():
+            delta[f"status:{status}"] += count
+        self._call(self._add_stats_delta, delta)
+    
+    def _call(self, callback, *args):
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            callback(*args)
+        else:
+            self._loop.call_soon_threadsafe(callback, *args)
+    
+    def _add_stats_delta(self, delta: Counter):
+        self._stats_delta.update(delta)
+        if self._stats_flush is None:
+            self._stats_flush = self._loop.call_later(self.coalesce_seconds, self._flush_stats)
+    
+    def _flush_stats(self):
+        delta, self._stats_delta = self._stats_delta, Counter()
+        self._stats_flush = None
+        by_status = {
+            key.split(":", 1)[1]: count
+            for key, count in delta.items()
+            if key.startswith("status:") and count
+        }
+        if delta["total_users"] or by_status:
+            self._dispatch("stats.delta", {
+                "total_users": delta["total_users"],
+                "by_status": by_status,
+            })
+    
+    def _dispatch(self, event_type: str, data: dict):
+        event = (self._next_id, event_type, json.dumps(data, ensure_ascii=False, default=str))
+        self._next_id += 1
+        self._history.append(event)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+    
+    # ========== الاشتراك ==========
+    
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscriber:
+        """
+        تسجيل مشترك جديد مع إعادة إرسال الأحداث بعد last_event_id
+        
+        إذا كان last_event_id أقدم من المخزن الدائري يُرسل حدث stream.reset
+        ليعيد العميل تحميل البيانات كاملة.
+        (يجب استدعاؤها من حلقة الأحداث)
+        """
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id is not None:
+            backlog = [event for event in self._history if event[0] > last_event_id]
+            oldest = self._history[0][0] if self._history else self._next_id
+            # فجوة في المخزن أو معرف من عملية سابقة (بعد إعادة التشغيل)
+            if last_event_id < oldest - 1 or last_event_id >= self._next_id:
+                backlog.insert(0, (None, "stream.reset", json.dumps({"last_event_id": last_event_id})))
+            if len(backlog) > self.queue_size:
+                backlog = [(None, "stream.reset", json.dumps({"last_event_id": last_event_id}))]
+            for event in backlog:
+                subscriber.queue.put_nowait(event)
+        self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+    
+    def _drop(self, subscriber: Subscriber):
+        """
+        فصل مشترك بطيء: تفريغ طابوره ووضع علامة نهاية (None)
+        """
+        self._subscribers.discard(subscriber)
+        self.dropped += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+    
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "last_event_id": self._next_id - 1,
+            "history": len(self._history),
+            "dropped": self.dropped,
+        }
+
+
+broadcaster = EventBroadcaster(
+    history_size=settings.EVENTS_HISTORY_SIZE,
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    coalesce_seconds=settings.EVENTS_COALESCE_SECONDS,
+)
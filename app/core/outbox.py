@@ -0,0 +1,44 @@
+# app/core/outbox.py
+"""
+سجل معالجات صندوق الصادر (Outbox)
+
+كل معالج يُسجَّل لموضوع (topic) باسم ثابت، وعند كتابة حدث يُنشأ صف مستقل
+لكل معالج مفعّل في OUTBOX_HANDLERS حتى تكون إعادة المحاولة لكل معالج على حدة.
+
+الاستخدام:
+    @outbox_registry.register("user.registered", "stats")
+    def update_stats(db, event, payload):
+        ...
+"""
+
+from app.core.config import settings
+
+
+class OutboxRegistry:
+    def __init__(self):
+        self._handlers = {}
+        self._topics = {}
+    
+    def register(self, topic: str, name: str):
+        def decorator(func):
+            self._handlers[name] = func
+            self._topics.setdefault(topic, [])
+            if name not in self._topics[topic]:
+                self._topics[topic].append(name)
+            return func
+        return decorator
+    
+    def handlers_for(self, topic: str):
+        """
+        أسماء المعالجات المفعّلة لموضوع معين
+        """
+        return [
+            name for name in self._topics.get(topic, [])
+            if name in settings.OUTBOX_HANDLERS
+        ]
+    
+    def get(self, name: str):
+        return self._handlers.get(name)
+
+
+outbox_registry = OutboxRegistry()
@@ -0,0 +1,205 @@
+# app/core/profiling.py
+"""
+أدوات التشخيص عند الطلب: معاينة CPU بالعينات وتتبع تخصيص الذاكرة
+
+- المعاينة تعمل في خيط منفصل يقرأ مكدسات الخيوط (sys._current_frames)
+  كل PROFILING_INTERVAL_MS، والنتيجة بصيغة collapsed stacks المتوافقة مع
+  أدوات flamegraph (مثل flamegraph.pl و speedscope).
+- لا يُضاف أي شيء للتطبيق ما لم يكن PROFILING_ENABLED مفعلاً مع PROFILING_TOKEN.
+"""
+
+from collections import Counter, OrderedDict
+from threading import Event, Lock, Thread, get_ident
+from typing import Optional
+import hmac
+import sys
+import tracemalloc
+import uuid
+
+from app.core.config import settings
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    parts = filename.replace("\\", "/").split("/")
+    short = "/".join(parts[-2:]) if len(parts) > 1 else filename
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """
+    معاين بالعينات لخيط محدد أو لجميع الخيوط
+    """
+    
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="sampling-profiler", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+    
+    def _run(self):
+        own_id = get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frames = {self.thread_id: frames[self.thread_id]} if self.thread_id in frames else {}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+    
+    def collapsed(self) -> str:
+        """
+        سطر لكل مكدس: "root;child;leaf count"
+        """
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.samples.most_common()
+        ) + "\n"
+
+
+class ProfileStore:
+    """
+    آخر معاينات الطلبات (محدودة العدد) للاطلاع عليها عبر /debug/profile/{id}
+    """
+    
+    def __init__(self, maxsize: int = 50):
+        self.maxsize = maxsize
+        self._profiles = OrderedDict()
+        self._lock = Lock()
+    
+    def add(self, collapsed: str) -> str:
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._profiles[profile_id] = collapsed
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+        return profile_id
+    
+    def get(self, profile_id: str) -> Optional[str]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profile_store = ProfileStore()
+
+
+class RequestProfilingMiddleware:
+    """
+    معاينة طلب واحد عند إرسال الترويسة X-Profile بقيمة PROFILING_TOKEN
+    
+    يُعاد معرف المعاينة في الترويسة X-Profile-Id. ملاحظة: نقاط الاتصال غير
+    المتزامنة تعمل على خيط حلقة الأحداث، لذلك قد تظهر في العينات طلبات
+    أخرى تعمل في نفس الوقت.
+    """
+    
+    def __init__(self, app, token: str, interval: float):
+        self.app = app
+        self.token = token.encode()
+        self.interval = interval
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        profiler = SamplingProfiler(self.interval, thread_id=get_ident()).start()
+        stopped = {}
+        
+        def finish() -> str:
+            if "id" not in stopped:
+                profiler.stop()
+                stopped["id"] = profile_store.add(profiler.collapsed())
+            return stopped["id"]
+        
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", finish().encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            finish()
+    
+    def _requested(self, scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                return _tokens_match(value, self.token)
+        return False
+
+
+def _tokens_match(given: bytes, expected: bytes) -> bool:
+    return bool(expected) and hmac.compare_digest(given, expected)
+
+
+class MemoryTracer:
+    """
+    فروقات tracemalloc بين لقطتين متتاليتين (يبدأ التتبع عند أول طلب)
+    """
+    
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._snapshot = None
+        self._lock = Lock()
+    
+    def diff(self, limit: int = 20):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._snapshot = tracemalloc.take_snapshot()
+                return {"tracing": True, "started": True, "top": []}
+            
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            stats = snapshot.compare_to(self._snapshot, "lineno")
+            self._snapshot = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+        
+        return {
+            "tracing": True,
+            "started": False,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+    
+    def stop(self):
+        with self._lock:
+            self._snapshot = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+memory_tracer = MemoryTracer()
+
+
+def profiling_enabled() -> bool:
+    return settings.PROFILING_ENABLED and bool(settings.PROFILING_TOKEN)
@@ -0,0 +1,322 @@
+# app/core/suggest.py
+"""
+فهرس الإكمال التلقائي (type-ahead) لأسماء المستخدمين وبريدهم داخل العملية
+
+قائمة مرتبة من المفاتيح الفريدة (كلمات الاسم بعد التطبيع والجزء المحلي من
+البريد) لكل منها مصفوفة معرفات، والبحث بالبادئة عبر bisect: O(log n + k).
+يُبنى عند بدء التطبيق بقراءة متدفقة من قاعدة البيانات، ويُحدَّث مع التسجيل
+وتغيير الحالة والحذف والأرشفة.
+ملاحظة: الفهرس خاص بكل عملية، والتحديث يتم محلياً فقط.
+"""
+
+from array import array
+from bisect import bisect_left, insort
+from threading import Lock
+import re
+import sys
+import time
+from heapq import merge
+from typing import NamedTuple
+
+# التشكيل (الفتحة... السكون، الشدة، الألف الخنجرية) والتطويل
+_ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+# (str.replace لكل حرف أسرع من str.translate مع النصوص العربية)
+_ARABIC_LETTERS = (
+    ("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"),
+    ("ى", "ي"), ("ئ", "ي"),
+    ("ؤ", "و"),
+    ("ة", "ه"),
+)
+_SEPARATORS = re.compile(r"[\s\-_.,+'\"()]+")
+
+
+def normalize(text: str) -> str:
+    """
+    تطبيع النص للمطابقة: حذف التشكيل والتطويل، توحيد الألف والياء والتاء
+    المربوطة، وتحويل الحروف اللاتينية إلى صغيرة
+    """
+    text = _ARABIC_MARKS.sub("", text)
+    for letter, replacement in _ARABIC_LETTERS:
+        if letter in text:
+            text = text.replace(letter, replacement)
+    return text.casefold()
+
+
+def tokenize(name: str, email: str) -> set:
+    """
+    مفاتيح الفهرس للمستخدم: كلمات الاسم (ومعها الكلمة بدون "ال")، والجزء
+    المحلي من البريد كاملاً ومقسّماً على . _ - +
+    """
+    tokens = set()
+    for word in _SEPARATORS.split(normalize(name or "")):
+        if word:
+            tokens.add(word)
+            if word.startswith("ال") and len(word) > 3:
+                tokens.add(word[2:])
+    
+    local_part = normalize((email or "").split("@", 1)[0])
+    if local_part:
+        tokens.add(local_part)
+        tokens.update(part for part in _SEPARATORS.split(local_part) if part)
+    return tokens
+
+
+class Suggestion(NamedTuple):
+    id: int
+    name: str
+    email: str
+    status: str
+
+
+class _Entry(NamedTuple):
+    name: str
+    email: str
+    status: str
+    # مفاتيح المستخدم (نفس النصوص المشتركة في الفهرس) لفحص بقية كلمات الاستعلام
+    keys: tuple
+
+
+def _entry(name: str, email: str, status: str):
+    keys = tuple(sys.intern(key) for key in tokenize(name, email))
+    return _Entry(name, email, status, keys)
+
+
+class SuggestIndex:
+    """
+    فهرس البادئات: مفاتيح فريدة مرتبة (نصوص مشتركة عبر sys.intern) ولكل
+    مفتاح معرفاته (رقم واحد أو array للمفاتيح المشتركة)
+    
+    المفاتيح الجديدة تُضاف إلى قائمة صغيرة مرتبة (pending) تُدمج في القائمة
+    الرئيسية كل pending_size مفتاحاً بـ list.sort (دمج مسارين مرتبين)، فلا
+    تُزاح القائمة الكبيرة مع كل تسجيل.
+    أثناء إعادة البناء تُسجَّل التعديلات وتُطبَّق على الفهرس الجديد قبل تبديله،
+    فلا يضيع تعديل حدث أثناء القراءة من قاعدة البيانات.
+    """
+    
+    def __init__(self, max_scan: int = 2000, pending_size: int = 4096):
+        self.max_scan = max_scan
+        self.pending_size = pending_size
+        self._keys = []
+        self._pending = []
+        self._postings = {}
+        self._users = {}
+        self._lock = Lock()
+        self._journal = None
+        self.ready = False
+        self.last_rebuild_seconds = None
+        self.last_rebuild_at = None
+        self.rebuilds = 0
+    
+    # ---------- التعديل ----------
+    
+    def _post(self, postings: dict, key: str, user_id: int, ordered: bool = True) -> bool:
+        """
+        إضافة المعرف لمفتاح (المستدعي يحذف مفاتيح المستخدم القديمة أولاً)،
+        والرد True إذا لم يكن للمفتاح معرفات
+        
+        المعرفات مرتبة تصاعدياً؛ إعادة البناء تضيف بدون ترتيب (ordered=False)
+        ثم ترتب كل المصفوفات مرة واحدة.
+        """
+        ids = postings.get(key)
+        if ids is None:
+            postings[key] = user_id
+            return True
+        if isinstance(ids, int):
+            postings[key] = array("q", sorted((ids, user_id)))
+        elif ordered:
+            insort(ids, user_id)
+        else:
+            ids.append(user_id)
+        return False
+    
+    def _unpost(self, postings: dict, key: str, user_id: int):
+        # المفتاح الفارغ يبقى في القائمة المرتبة حتى الدمج التالي ويُتجاهل في البحث
+        ids = postings.get(key)
+        if ids is None:
+            return
+        if isinstance(ids, int):
+            if ids == user_id:
+                del postings[key]
+        elif user_id in ids:
+            ids.remove(user_id)
+            if len(ids) == 1:
+                postings[key] = ids[0]
+    
+    @staticmethod
+    def _contains(keys: list, key: str) -> bool:
+        position = bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+    
+    def _compact(self, keys: list, pending: list, postings: dict):
+        """
+        دمج المفاتيح الجديدة في القائمة الرئيسية مع حذف المفاتيح الفارغة والمكررة
+        """
+        keys[:] = [key for key in sorted(set(keys).union(pending)) if key in postings]
+        pending.clear()
+    
+    def _apply(self, keys: list, pending: list, postings: dict, users: dict,
+               op: str, user_id: int, value):
+        old = users.get(user_id)
+        if op == "status":
+            if old is not None:
+                users[user_id] = old._replace(status=value)
+            return
+        if old is not None:
+            for key in old.keys:
+                self._unpost(postings, key, user_id)
+            del users[user_id]
+        if op == "add":
+            name, email, status = value
+            entry = _entry(name, email, status)
+            users[user_id] = entry
+            for key in entry.keys:
+                # المفتاح الذي فرغ ثم عاد يبقى في إحدى القائمتين فلا يُكرر
+                if (self._post(postings, key, user_id)
+                        and not self._contains(keys, key)
+                        and not self._contains(pending, key)):
+                    insort(pending, key)
+            if len(pending) > self.pending_size:
+                self._compact(keys, pending, postings)
+    
+    def _mutate(self, op: str, user_id: int, value=None):
+        with self._lock:
+            self._apply(self._keys, self._pending, self._postings, self._users,
+                        op, user_id, value)
+            if self._journal is not None:
+                self._journal.append((op, user_id, value))
+    
+    def add(self, user_id: int, name: str, email: str, status: str):
+        """
+        إضافة مستخدم أو استبدال بياناته
+        """
+        self._mutate("add", user_id, (name, email, status))
+    
+    def set_status(self, status: str, *user_ids: int):
+        for user_id in user_ids:
+            self._mutate("status", user_id, status)
+    
+    def remove(self, *user_ids: int):
+        for user_id in user_ids:
+            self._mutate("remove", user_id)
+    
+    # ---------- إعادة البناء ----------
+    
+    def rebuild(self, rows) -> float:
+        """
+        بناء الفهرس من صفوف (id, name, email, status) متدفقة ثم تبديله
+        
+        الرد: مدة البناء بالثواني
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self._journal = []
+        try:
+            users = {}
+            postings = {}
+            for user_id, name, email, status in rows:
+                entry = _entry(name, email, status)
+                users[user_id] = entry
+                for key in entry.keys:
+                    self._post(postings, key, user_id, ordered=False)
+            for ids in postings.values():
+                if not isinstance(ids, int):
+                    ids[:] = array("q", sorted(ids))
+            keys = sorted(postings)
+            pending = []
+            
+            with self._lock:
+                for op, user_id, value in self._journal:
+                    self._apply(keys, pending, postings, users, op, user_id, value)
+                self._keys, self._pending = keys, pending
+                self._postings, self._users = postings, users
+                self.ready = True
+        finally:
+            with self._lock:
+                self._journal = None
+        
+        self.last_rebuild_seconds = time.perf_counter() - started
+        self.last_rebuild_at = time.time()
+        self.rebuilds += 1
+        return self.last_rebuild_seconds
+    
+    # ---------- البحث ----------
+    
+    @staticmethod
+    def _range(keys: list, prefix: str):
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield keys[position]
+            position += 1
+    
+    def suggest(self, query: str, limit: int = 10) -> list:
+        """
+        أول limit مستخدمين لديهم مفتاح يبدأ بكل كلمة من كلمات الاستعلام
+        
+        أطول كلمة تحدد نطاق المفاتيح، وبقية الكلمات تُفحص على نص مفاتيح
+        المستخدم. الترتيب أبجدي حسب المفتاح (المطابقة التامة أولاً) ثم المعرف
+        تنازلياً (المعرفات تتزايد مع التسجيل داخل كل shard).
+        """
+        terms = sorted({term for term in _SEPARATORS.split(normalize(query)) if term},
+                       key=len, reverse=True)
+        if not terms or limit <= 0:
+            return []
+        prefix, others = terms[0], terms[1:]
+        
+        results = []
+        seen = set()
+        scanned = 0
+        with self._lock:
+            postings, users = self._postings, self._users
+            for key in merge(self._range(self._keys, prefix), self._range(self._pending, prefix)):
+                ids = postings.get(key)
+                if ids is None:
+                    continue
+                for user_id in ((ids,) if isinstance(ids, int) else reversed(ids)):
+                    scanned += 1
+                    if user_id in seen:
+                        continue
+                    seen.add(user_id)
+                    entry = users[user_id]
+                    if all(any(key.startswith(term) for key in entry.keys) for term in others):
+                        results.append(Suggestion(user_id, entry.name, entry.email, entry.status))
+                        if len(results) >= limit:
+                            return results
+                    if scanned >= self.max_scan:
+                        return results
+        return results
+    
+    # ---------- الإحصائيات ----------
+    
+    def memory_bytes(self) -> int:
+        """
+        تقدير تقريبي للذاكرة: المفاتيح ومصفوفات المعرفات وسجلات المستخدمين
+        (الحالة نص مشترك بين السجلات فلا تُحسب)
+        """
+        with self._lock:
+            postings = list(self._postings.items())
+            entries = list(self._users.values())
+            total = (sys.getsizeof(self._keys) + sys.getsizeof(self._pending)
+                     + sys.getsizeof(self._postings) + sys.getsizeof(self._users))
+        for key, ids in postings:
+            total += sys.getsizeof(key) + sys.getsizeof(ids)
+        for entry in entries:
+            total += (sys.getsizeof(entry) + sys.getsizeof(entry.name)
+                      + sys.getsizeof(entry.email) + sys.getsizeof(entry.keys))
+        return total
+    
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "users": len(self._users),
+            "keys": len(self._postings),
+            "pending_keys": len(self._pending),
+            "memory_bytes": self.memory_bytes(),
+            "rebuilds": self.rebuilds,
+            "last_rebuild_seconds": (
+                round(self.last_rebuild_seconds, 4) if self.last_rebuild_seconds is not None else None
+            ),
+            "last_rebuild_at": self.last_rebuild_at,
+        }
+
+
+suggest_index = SuggestIndex()
@@ -4,26 +4,47 @@
 """
 
 from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, insert, exists, func, text, literal, true, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
 from app import models, schemas
-from datetime import datetime, date
+from app.core.cache import UserRecord, user_cache, count_cache
+from app.core.events import broadcaster
+from app.core.outbox import outbox_registry
+from app.core.suggest import suggest_index
+from app.database import (
+    NUM_BUCKETS, ShardSessions, bucket_shard, email_bucket, id_bucket, make_user_id,
+    shard_of, shard_session_factories,
+)
+from datetime import datetime, date, timedelta, timezone
+from collections import Counter
+from itertools import chain, islice
+import heapq
+import json
+import random
 import uuid
 
+# الحالات المعروفة للمستخدمين
+USER_STATUSES = ("pending", "approved", "rejected")
+
+# الحقول المسموح بطلبها عبر fields= في القوائم والبحث
+USER_FIELDS = ("id", "name", "email", "phone", "status", "is_active", "created_at", "updated_at")
+
+# حجم الدفعة في العمليات الجماعية (أقل من حد معاملات SQLite)
+BULK_CHUNK_SIZE = 500
+
 class UserCRUD:
     @staticmethod
     def create_user(db: Session, user_data: schemas.UserCreate):
         """
         إنشاء مستخدم جديد
         """
-        # التحقق من وجود البريد مسبقاً
-        existing_user = db.query(models.User).filter(
-            models.User.email == user_data.email
-        ).first()
-        
-        if existing_user:
+        # التحقق من وجود البريد مسبقاً (في الجدول أو الأرشيف)
+        if UserCRUD.email_exists(db, user_data.email):
             return None
         
-        # إنشاء مستخدم جديد
+        # إنشاء مستخدم جديد بمعرف عام يحمل دلو البريد (يحدد الـ shard)
         db_user = models.User(
+            id=IdSequenceCRUD.next_id(db, email_bucket(user_data.email)),
             name=user_data.name,
             email=user_data.email,
             phone=user_data.phone,
@@ -31,34 +52,184 @@ class UserCRUD:
         )
         
         db.add(db_user)
+        db.flush()
+        db.add(models.RegisteredEmail(email=db_user.email, user_id=db_user.id))
+        
+        # التجميعات الزمنية تُحدَّث في نفس المعاملة (مثل تغيير الحالة) حتى لا
+        # تظهر أعداد سالبة قبل معالجة الحدث، وبقية الأعمال عبر صندوق الصادر
+        record = UserRecord.from_user(db_user)
+        if db_user.created_at is not None:
+            RollupCRUD.record_registration(db, db_user.created_at, record.status)
+        OutboxCRUD.enqueue(db, "user.registered", UserCRUD.registration_payload(db_user))
+        counter_keys = CountCRUD.bump(db, total=1, by_status={record.status: 1})
         db.commit()
-        db.refresh(db_user)
+        user_cache.invalidate(record.id)
+        count_cache.invalidate(*counter_keys)
+        suggest_index.add(record.id, record.name, record.email, record.status)
         
-        # تحديث الإحصائيات
-        stats = db.query(models.RegistrationStats).first()
-        if stats:
-            stats.total_users += 1
-            stats.last_updated = datetime.now()
-            db.commit()
+        broadcaster.publish("user.registered", record.to_dict())
+        broadcaster.publish_stats_delta(total_users=1, by_status={record.status: 1})
         
         return db_user
     
+    @staticmethod
+    def email_exists(db: Session, email: str) -> bool:
+        """
+        هل البريد مسجل لمستخدم حالي أو مؤرشف
+        """
+        if db.get(models.RegisteredEmail, email) is not None:
+            return True
+        return db.execute(
+            select(models.User.id).where(models.User.email == email)
+        ).first() is not None
+    
+    @staticmethod
+    def registration_payload(user: models.User):
+        """
+        بيانات حدث التسجيل في صندوق الصادر
+        """
+        return {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "phone": user.phone,
+            "status": user.status,
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+        }
+    
     @staticmethod
     def get_user(db: Session, user_id: int):
         """
         الحصول على مستخدم بواسطة المعرف
         """
-        return db.query(models.User).filter(models.User.id == user_id).first()
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user is None:
+            user = db.query(models.UserArchive).filter(
+                models.UserArchive.id == user_id
+            ).first()
+        return user
     
     @staticmethod
-    def get_all_users(db: Session, skip: int = 0, limit: int = 100):
+    def get_user_record(db: Session, user_id: int):
         """
-        الحصول على جميع المستخدمين مع إمكانية الترقيم
+        الحصول على سجل مستخدم مضغوط مع ذاكرة التخزين المؤقت
+        
+        عند عدم وجوده في الذاكرة يُجلب بجملة select للأعمدة فقط (بدون ORM)
         """
-        return db.query(models.User).order_by(
+        record = user_cache.get(user_id)
+        if record is not None:
+            return record
+        
+        generation = user_cache.generation
+        row = None
+        # البحث في الجدول الحالي ثم في الأرشيف
+        for model in (models.User, models.UserArchive):
+            row = db.execute(
+                select(*(getattr(model, field) for field in UserRecord._fields))
+                .where(model.id == user_id)
+            ).first()
+            if row is not None:
+                break
+        if row is None:
+            return None
+        
+        record = UserRecord.from_row(row)
+        user_cache.put(record, generation)
+        return record
+    
+    @staticmethod
+    def get_all_users(db: Session, skip: int = 0, limit: int = 100, status: str = None):
+        """
+        الحصول على جميع المستخدمين مع إمكانية الترقيم والتصفية حسب الحالة
+        """
+        query = db.query(models.User)
+        if status is not None:
+            query = query.filter(models.User.status == status)
+        return query.order_by(
             models.User.created_at.desc()
         ).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def list_rows(db: Session, fields: tuple, skip: int = 0, limit: int = 100,
+                  status: str = None):
+        """
+        قائمة المستخدمين كصفوف خفيفة للأعمدة المطلوبة فقط (select بدون ORM)
+        """
+        query = select(*(getattr(models.User, field) for field in fields))
+        if status is not None:
+            query = query.where(models.User.status == status)
+        return db.execute(
+            query.order_by(models.User.created_at.desc()).offset(skip).limit(limit)
+        ).all()
+    
+    @staticmethod
+    def search_rows(db: Session, text_query: str, fields: tuple):
+        """
+        البحث بالاسم أو البريد مع جلب الأعمدة المطلوبة فقط
+        """
+        return db.execute(
+            select(*(getattr(models.User, field) for field in fields)).where(
+                (models.User.name.ilike(f"%{text_query}%")) |
+                (models.User.email.ilike(f"%{text_query}%"))
+            )
+        ).all()
+    
+    @staticmethod
+    def export_rows(db: Session, fields: tuple, status: str = None, chunk_size: int = 1000):
+        """
+        كل صفوف المستخدمين من الأحدث، تُقرأ على دفعات (yield_per) دون تحميلها كلها
+        """
+        query = select(*(getattr(models.User, field) for field in fields))
+        if status is not None:
+            query = query.where(models.User.status == status)
+        yield from db.execute(
+            query.order_by(models.User.created_at.desc())
+            .execution_options(yield_per=chunk_size)
+        )
+    
+    @staticmethod
+    def suggest_rows(db: Session, chunk_size: int = 5000):
+        """
+        المستخدمون النشطون (id, name, email, status) لبناء فهرس الإكمال، على دفعات
+        """
+        yield from db.execute(
+            select(models.User.id, models.User.name, models.User.email, models.User.status)
+            .where(models.User.is_active == True)
+            .execution_options(yield_per=chunk_size)
+        )
+    
+    @staticmethod
+    def summary_counts(db: Session):
+        """
+        أعداد المستخدمين حسب الحالة والنشاط وتسجيلات اليوم
+        """
+        counts = {
+            "total": db.query(models.User).count(),
+            "active": db.query(models.User).filter(models.User.is_active == True).count(),
+            "today": db.query(models.User).filter(models.User.created_at >= date.today()).count(),
+        }
+        for status in USER_STATUSES:
+            counts[status] = db.query(models.User).filter(models.User.status == status).count()
+        return counts
+    
+    @staticmethod
+    def serialize_rows(fields: tuple, rows: list):
+        """
+        تحويل الصفوف إلى قواميس مباشرة (التواريخ بصيغة ISO)
+        """
+        date_fields = [i for i, field in enumerate(fields) if field in ("created_at", "updated_at")]
+        if not date_fields:
+            return [dict(zip(fields, row)) for row in rows]
+        
+        results = []
+        for row in rows:
+            values = list(row)
+            for i in date_fields:
+                if values[i] is not None:
+                    values[i] = values[i].isoformat()
+            results.append(dict(zip(fields, values)))
+        return results
+    
     @staticmethod
     def update_user_status(db: Session, user_id: int, status: str):
         """
@@ -66,10 +237,30 @@ class UserCRUD:
         """
         user = db.query(models.User).filter(models.User.id == user_id).first()
         if user:
+            old_status = user.status
             user.status = status
             user.updated_at = datetime.now()
+            # إنهاء حجز المراجعة بعد اتخاذ القرار
+            user.claimed_by = None
+            user.claim_expires_at = None
+            RollupCRUD.record_status_change(db, user, old_status)
+            counter_keys = []
+            if old_status != status:
+                counter_keys = CountCRUD.bump(db, by_status={old_status: -1, status: 1})
             db.commit()
+            user_cache.invalidate(user_id)
+            count_cache.invalidate(*counter_keys)
+            suggest_index.set_status(status, user_id)
             db.refresh(user)
+            
+            if old_status != status:
+                broadcaster.publish("user.status_changed", {
+                    "id": user.id,
+                    "status": status,
+                    "old_status": old_status,
+                    "updated_at": user.updated_at.isoformat() if user.updated_at else None,
+                })
+                broadcaster.publish_stats_delta(by_status={old_status: -1, status: 1})
         return user
     
     @staticmethod
@@ -82,8 +273,695 @@ class UserCRUD:
             user.is_active = False
             user.updated_at = datetime.now()
             db.commit()
+            user_cache.invalidate(user_id)
+            suggest_index.remove(user_id)
             db.refresh(user)
+            broadcaster.publish("user.deleted", {"id": user.id})
         return user
+    
+    @staticmethod
+    def bulk_update_status(db: Session, status: str, user_ids: list = None,
+                           current_status: str = None, created_before: datetime = None,
+                           chunk_size: int = BULK_CHUNK_SIZE):
+        """
+        تحديث حالة مجموعة مستخدمين دفعة واحدة
+        
+        إما بقائمة معرفات (user_ids) أو بمرشح (current_status / created_before).
+        يتم التحديث على دفعات بجملة UPDATE ... WHERE id IN (...) RETURNING
+        لكل حالة سابقة، ويُحفظ كل دفعة مع تحديث التجميعات مرة واحدة لها.
+        
+        الرد: قاموس بالمعرفات حسب النتيجة (updated, unchanged, not_found)
+        """
+        results = {"updated": [], "unchanged": [], "not_found": []}
+        
+        # الحالات السابقة التي يُسمح بالانتقال منها
+        from_statuses = [s for s in USER_STATUSES if s != status]
+        if current_status is not None:
+            from_statuses = [s for s in from_statuses if s == current_status]
+        
+        for chunk in UserCRUD._bulk_chunks(db, user_ids, current_status,
+                                           created_before, chunk_size):
+            now = datetime.now()
+            deltas = Counter()
+            by_status = Counter()
+            updated = set()
+            
+            for old_status in from_statuses:
+                rows = db.execute(
+                    update(models.User)
+                    .where(models.User.id.in_(chunk), models.User.status == old_status)
+                    .values(status=status, updated_at=now,
+                            claimed_by=None, claim_expires_at=None)
+                    .returning(models.User.id, models.User.created_at)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                by_status[old_status] -= len(rows)
+                by_status[status] += len(rows)
+                for user_id, created_at in rows:
+                    updated.add(user_id)
+                    if created_at is not None:
+                        hour_start = RollupCRUD.bucket_start(created_at)
+                        deltas[(hour_start, old_status)] -= 1
+                        deltas[(hour_start, status)] += 1
+            
+            remaining = [user_id for user_id in chunk if user_id not in updated]
+            existing = set()
+            if remaining:
+                existing = set(db.execute(
+                    select(models.User.id).where(models.User.id.in_(remaining))
+                ).scalars())
+            
+            RollupCRUD.apply_deltas(db, deltas)
+            counter_keys = CountCRUD.bump(db, by_status=by_status)
+            db.commit()
+            if updated:
+                user_cache.invalidate(*updated)
+                count_cache.invalidate(*counter_keys)
+                suggest_index.set_status(status, *updated)
+                broadcaster.publish("users.status_bulk", {
+                    "status": status,
+                    "ids": [user_id for user_id in chunk if user_id in updated],
+                })
+                broadcaster.publish_stats_delta(by_status=dict(by_status))
+            
+            for user_id in chunk:
+                if user_id in updated:
+                    results["updated"].append(user_id)
+                elif user_id in existing:
+                    results["unchanged"].append(user_id)
+                else:
+                    results["not_found"].append(user_id)
+        
+        return results
+    
+    @staticmethod
+    def _bulk_chunks(db: Session, user_ids, current_status, created_before, chunk_size):
+        """
+        تقسيم المعرفات المطلوبة إلى دفعات
+        
+        مع المرشح تُجلب المعرفات بترقيم المفاتيح (id > آخر معرف) دفعة بدفعة
+        """
+        if user_ids is not None:
+            unique_ids = list(dict.fromkeys(user_ids))
+            for i in range(0, len(unique_ids), chunk_size):
+                yield unique_ids[i:i + chunk_size]
+            return
+        
+        last_id = 0
+        while True:
+            query = select(models.User.id).where(models.User.id > last_id)
+            if current_status is not None:
+                query = query.where(models.User.status == current_status)
+            if created_before is not None:
+                query = query.where(models.User.created_at < created_before)
+            chunk = list(db.execute(
+                query.order_by(models.User.id).limit(chunk_size)
+            ).scalars())
+            if not chunk:
+                return
+            last_id = chunk[-1]
+            yield chunk
+
+class IdSequenceCRUD:
+    """
+    معرفات المستخدمين العامة: id = التسلسل * NUM_BUCKETS + دلو البريد
+    """
+    
+    @staticmethod
+    def next_id(db: Session, bucket: int) -> int:
+        """
+        حجز المعرف التالي للدلو ضمن معاملة المستدعي (بدون commit)
+        
+        صف الدلو يبقى مقفلاً حتى نهاية المعاملة على PostgreSQL، فتتسلسل
+        التسجيلات في نفس الدلو فقط بينما تتوازى بقية الدلاء.
+        """
+        for _ in range(2):
+            next_seq = db.execute(
+                update(models.IdSequence)
+                .where(models.IdSequence.bucket == bucket)
+                .values(next_seq=models.IdSequence.next_seq + 1)
+                .returning(models.IdSequence.next_seq)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if next_seq is not None:
+                return make_user_id(next_seq - 1, bucket)
+            IdSequenceCRUD.seed(db, bucket)
+        raise RuntimeError(f"تعذر إنشاء تسلسل المعرفات للدلو {bucket}")
+    
+    @staticmethod
+    def seed(db: Session, bucket: int):
+        """
+        إنشاء تسلسل الدلو بعد أكبر معرف موجود في الـ shard
+        
+        المعرفات القديمة (قبل التقسيم) أرقام متتالية؛ البدء بعدها يضمن ألا
+        يتكرر أي معرف قديم في الجدول أو الأرشيف.
+        """
+        max_id = max(
+            db.execute(select(func.max(model.id))).scalar() or 0
+            for model in (models.User, models.UserArchive)
+        )
+        values = {"bucket": bucket, "next_seq": max_id // NUM_BUCKETS + 1}
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert_for = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            db.execute(
+                insert_for(models.IdSequence).values(**values)
+                .on_conflict_do_nothing(index_elements=["bucket"])
+            )
+        elif db.get(models.IdSequence, bucket) is None:
+            db.add(models.IdSequence(**values))
+            db.flush()
+
+class ReviewQueueCRUD:
+    """
+    قائمة مراجعة الطلبات المعلقة لعدة مشرفين في نفس الوقت
+    
+    كل مشرف يحجز الطلبات التالية لمدة محددة (claim_expires_at)، وبعد انتهاء
+    المدة تعود الطلبات غير المراجعة إلى القائمة تلقائياً.
+    """
+    
+    @staticmethod
+    def _lease_free(now: datetime):
+        return (models.User.claim_expires_at.is_(None)) | (models.User.claim_expires_at < now)
+    
+    # الحجز ليس تعديلاً على بيانات الطلب: تثبيت updated_at حتى لا يضبطه
+    # onupdate=func.now() (ولا يختلف السجل المخزّن في user_cache عن القاعدة)
+    KEEP_UPDATED_AT = {"updated_at": models.User.updated_at}
+    
+    @staticmethod
+    def peek(db: Session, count: int):
+        """
+        أقدم N طلبات معلقة غير محجوزة (created_at, id) دون حجزها
+        """
+        now = datetime.now(timezone.utc)
+        return db.execute(
+            select(models.User.created_at, models.User.id)
+            .where(
+                models.PENDING_QUEUE_CLAUSE,
+                models.User.is_active == True,
+                ReviewQueueCRUD._lease_free(now),
+            )
+            .order_by(models.User.created_at, models.User.id)
+            .limit(count)
+        ).all()
+    
+    @staticmethod
+    def claim(db: Session, moderator: str, count: int, lease_seconds: int):
+        """
+        حجز أقدم N طلبات معلقة غير محجوزة
+        
+        على PostgreSQL تُقفل الصفوف بـ FOR UPDATE SKIP LOCKED فلا ينتظر
+        المشرفون بعضهم. على SQLite تكون جملة UPDATE الواحدة ذرية، وشرط
+        انتهاء الحجز داخلها يمنع حجز نفس الطلب مرتين.
+        """
+        now = datetime.now(timezone.utc)
+        candidates = (
+            select(models.User.id)
+            .where(
+                models.PENDING_QUEUE_CLAUSE,
+                models.User.is_active == True,
+                ReviewQueueCRUD._lease_free(now),
+            )
+            .order_by(models.User.created_at, models.User.id)
+            .limit(count)
+            .with_for_update(skip_locked=True)
+        )
+        rows = db.execute(
+            update(models.User)
+            .where(models.User.id.in_(candidates.scalar_subquery()))
+            .values(
+                claimed_by=moderator,
+                claim_expires_at=now + timedelta(seconds=lease_seconds),
+                **ReviewQueueCRUD.KEEP_UPDATED_AT,
+            )
+            .returning(models.User)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        return sorted(rows, key=lambda user: (user.created_at, user.id))
+    
+    @staticmethod
+    def renew(db: Session, moderator: str, user_ids: list, lease_seconds: int):
+        """
+        تمديد حجز الطلبات التي ما زال المشرف يحجزها
+        """
+        now = datetime.now(timezone.utc)
+        renewed = db.execute(
+            update(models.User)
+            .where(
+                models.User.id.in_(user_ids),
+                models.User.claimed_by == moderator,
+                models.User.claim_expires_at >= now,
+                models.PENDING_QUEUE_CLAUSE,
+            )
+            .values(
+                claim_expires_at=now + timedelta(seconds=lease_seconds),
+                **ReviewQueueCRUD.KEEP_UPDATED_AT,
+            )
+            .returning(models.User.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        return renewed
+    
+    @staticmethod
+    def release(db: Session, moderator: str, user_ids: list):
+        """
+        إعادة طلبات محجوزة إلى القائمة دون اتخاذ قرار
+        """
+        released = db.execute(
+            update(models.User)
+            .where(
+                models.User.id.in_(user_ids),
+                models.User.claimed_by == moderator,
+            )
+            .values(claimed_by=None, claim_expires_at=None, **ReviewQueueCRUD.KEEP_UPDATED_AT)
+            .returning(models.User.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        return released
+
+class OutboxCRUD:
+    """
+    صندوق الصادر: تسجيل الأعمال اللاحقة ضمن معاملة الطلب ومعالجتها لاحقاً
+    """
+    
+    @staticmethod
+    def enqueue(db: Session, topic: str, payload: dict):
+        """
+        إضافة حدث للصندوق (صف لكل معالج مفعّل) دون حفظ؛ يُحفظ مع معاملة الطلب
+        """
+        now = datetime.now(timezone.utc)
+        data = json.dumps(payload, ensure_ascii=False, default=str)
+        events = [
+            models.OutboxEvent(
+                topic=topic,
+                handler=handler,
+                payload=data,
+                status="pending",
+                attempts=0,
+                available_at=now,
+            )
+            for handler in outbox_registry.handlers_for(topic)
+        ]
+        db.add_all(events)
+        return events
+    
+    @staticmethod
+    def claim_batch(db: Session, worker: str, batch_size: int, lease_seconds: int):
+        """
+        حجز دفعة من الأحداث الجاهزة للعامل (FOR UPDATE SKIP LOCKED على PostgreSQL)
+        """
+        now = datetime.now(timezone.utc)
+        candidates = (
+            select(models.OutboxEvent.id)
+            .where(
+                models.OUTBOX_PENDING_CLAUSE,
+                models.OutboxEvent.available_at <= now,
+                (models.OutboxEvent.locked_until.is_(None)) |
+                (models.OutboxEvent.locked_until < now),
+            )
+            .order_by(models.OutboxEvent.available_at, models.OutboxEvent.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        events = db.execute(
+            update(models.OutboxEvent)
+            .where(models.OutboxEvent.id.in_(candidates.scalar_subquery()))
+            .values(
+                locked_by=worker,
+                locked_until=now + timedelta(seconds=lease_seconds),
+                attempts=models.OutboxEvent.attempts + 1,
+            )
+            .returning(
+                models.OutboxEvent.id,
+                models.OutboxEvent.topic,
+                models.OutboxEvent.handler,
+                models.OutboxEvent.payload,
+                models.OutboxEvent.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return sorted(events, key=lambda event: event.id)
+    
+    @staticmethod
+    def renew_leases(db: Session, event_ids: list, worker: str, lease_seconds: int) -> set:
+        """
+        تجديد حجز بقية أحداث الدفعة (بعد مرور نصف المهلة)
+        
+        حجز الدفعة قد ينتهي أثناء معالجة الأحداث السابقة (بريد أو webhook
+        بطيء)، فتُمدَّد المهلة للأحداث المتبقية التي ما زالت محجوزة للعامل.
+        الرد: معرفات الأحداث المجددة؛ الحدث غير الموجود فيها انتهت مهلته
+        (قد يكون عامل آخر حجزه) فيُترك دون تنفيذ.
+        """
+        now = datetime.now(timezone.utc)
+        renewed = db.execute(
+            update(models.OutboxEvent)
+            .where(
+                models.OutboxEvent.id.in_(event_ids),
+                models.OutboxEvent.locked_by == worker,
+                models.OutboxEvent.locked_until > now,
+                models.OUTBOX_PENDING_CLAUSE,
+            )
+            .values(locked_until=now + timedelta(seconds=lease_seconds))
+            .returning(models.OutboxEvent.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        return set(renewed)
+    
+    @staticmethod
+    def mark_done(db: Session, event_id: int, worker: str) -> bool:
+        """
+        تعليم الحدث كمنجز ضمن معاملة المعالج (بدون commit)
+        
+        يُرجع False إذا فقد العامل الحجز (انتهت المهلة وحجزه عامل آخر)،
+        وعندها يجب التراجع عن آثار المعالج حتى لا تُطبّق مرتين.
+        """
+        result = db.execute(
+            update(models.OutboxEvent)
+            .where(
+                models.OutboxEvent.id == event_id,
+                models.OutboxEvent.locked_by == worker,
+                models.OUTBOX_PENDING_CLAUSE,
+            )
+            .values(
+                status="done",
+                locked_by=None,
+                locked_until=None,
+                last_error=None,
+                processed_at=datetime.now(timezone.utc),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+    
+    @staticmethod
+    def mark_failed(db: Session, event_id: int, worker: str, attempts: int, error: str,
+                    max_attempts: int, backoff_seconds: float, max_backoff_seconds: float):
+        """
+        تسجيل فشل المحاولة: إعادة الجدولة بتأخير أُسّي أو تعليمه failed نهائياً
+        """
+        delay = min(backoff_seconds * (2 ** (attempts - 1)), max_backoff_seconds)
+        delay *= random.uniform(0.8, 1.2)
+        db.execute(
+            update(models.OutboxEvent)
+            .where(
+                models.OutboxEvent.id == event_id,
+                models.OutboxEvent.locked_by == worker,
+            )
+            .values(
+                status="failed" if attempts >= max_attempts else "pending",
+                available_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+                locked_by=None,
+                locked_until=None,
+                last_error=error[:2000],
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    
+    @staticmethod
+    def counts(db: Session):
+        """
+        عدد الأحداث حسب المعالج والحالة
+        """
+        rows = db.execute(
+            select(
+                models.OutboxEvent.handler,
+                models.OutboxEvent.status,
+                func.count(),
+            ).group_by(models.OutboxEvent.handler, models.OutboxEvent.status)
+        ).all()
+        counts = {}
+        for handler, status, count in rows:
+            counts.setdefault(handler, {})[status] = count
+        return counts
+
+class ArchiveCRUD:
+    """
+    نقل المستخدمين غير النشطين ومن تم البت فيهم إلى users_archive
+    """
+    COLUMNS = ("id", "created_at", "name", "email", "phone", "is_active", "status", "updated_at")
+    
+    # أقسام الأرشيف السنوية التي تم إنشاؤها في هذه العملية (PostgreSQL)
+    # بالشكل (الـ shard، السنة)
+    _partitions = set()
+    
+    @staticmethod
+    def archived_created_at():
+        """
+        قيمة created_at في الأرشيف (مفتاح التقسيم لا يقبل NULL)
+        """
+        return func.coalesce(models.User.created_at, models.User.updated_at, func.now())
+    
+    @staticmethod
+    def create_partitions(db: Session, years) -> set:
+        """
+        إنشاء أقسام السنوات في الـ shard دون حفظ (PostgreSQL فقط)
+        
+        الرد: الأقسام التي أُنشئت (تُضاف إلى _partitions بعد نجاح المعاملة)
+        """
+        shard = shard_of(db)
+        created = {(shard, int(year)) for year in years} - ArchiveCRUD._partitions
+        for _, year in created:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS users_archive_y{year} "
+                f"PARTITION OF users_archive "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            ))
+        return created
+    
+    @staticmethod
+    def ensure_partitions(db: Session, user_ids: list) -> set:
+        """
+        إنشاء أقسام السنوات اللازمة لصفوف الدفعة من جدول users
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return set()
+        # نفس تعبير الإدراج، حتى تجد الصفوف بدون created_at قسمها
+        years = db.execute(
+            select(func.extract("year", ArchiveCRUD.archived_created_at())).distinct()
+            .where(models.User.id.in_(user_ids))
+        ).scalars()
+        return ArchiveCRUD.create_partitions(db, years)
+    
+    @staticmethod
+    def ensure_partitions_for(db: Session, created_at_values: list) -> set:
+        """
+        إنشاء أقسام السنوات لقيم created_at لصفوف أرشيف منسوخة من shard آخر
+        
+        السنة تُحسب في القاعدة الهدف، بتوقيت جلستها الذي تُفسَّر به حدود الأقسام.
+        """
+        if db.get_bind().dialect.name != "postgresql" or not created_at_values:
+            return set()
+        years = db.execute(
+            select(func.extract("year", func.unnest(
+                postgresql.array(created_at_values, type_=DateTime(timezone=True))
+            ))).distinct()
+        ).scalars()
+        return ArchiveCRUD.create_partitions(db, years)
+    
+    @staticmethod
+    def archive(db: Session, older_than_days: int, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        أرشفة الصفوف المستحقة على دفعات، كل دفعة في معاملة واحدة:
+        تسجيل البريد في registered_emails ثم النسخ إلى الأرشيف ثم الحذف
+        
+        الرد: عدد الصفوف المؤرشفة
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        decided_at = func.coalesce(models.User.updated_at, models.User.created_at)
+        archived = 0
+        last_id = 0
+        
+        while True:
+            chunk = list(db.execute(
+                select(models.User.id)
+                .where(
+                    models.User.id > last_id,
+                    (models.User.is_active == False) |
+                    (models.User.status.in_(["approved", "rejected"]) & (decided_at < cutoff)),
+                )
+                .order_by(models.User.id)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
+            ).scalars())
+            if not chunk:
+                break
+            last_id = chunk[-1]
+            
+            # البريد يبقى محجوزاً بعد خروجه من جدول users
+            db.execute(
+                insert(models.RegisteredEmail).from_select(
+                    ["email", "user_id"],
+                    select(models.User.email, models.User.id).where(
+                        models.User.id.in_(chunk),
+                        ~exists().where(models.RegisteredEmail.email == models.User.email),
+                    )
+                )
+            )
+            
+            partitions = ArchiveCRUD.ensure_partitions(db, chunk)
+            columns = [
+                ArchiveCRUD.archived_created_at()
+                if column == "created_at" else getattr(models.User, column)
+                for column in ArchiveCRUD.COLUMNS
+            ]
+            db.execute(
+                insert(models.UserArchive).from_select(
+                    list(ArchiveCRUD.COLUMNS),
+                    select(*columns).where(models.User.id.in_(chunk))
+                )
+            )
+            by_status = Counter(dict(db.execute(
+                select(models.User.status, func.count())
+                .where(models.User.id.in_(chunk))
+                .group_by(models.User.status)
+            ).all()))
+            db.execute(
+                delete(models.User)
+                .where(models.User.id.in_(chunk))
+                .execution_options(synchronize_session=False)
+            )
+            counter_keys = CountCRUD.bump(
+                db,
+                total=-len(chunk),
+                by_status={status: -count for status, count in by_status.items()}
+            )
+            db.commit()
+            ArchiveCRUD._partitions.update(partitions)
+            
+            archived += len(chunk)
+            user_cache.invalidate(*chunk)
+            count_cache.invalidate(*counter_keys)
+            suggest_index.remove(*chunk)
+            broadcaster.publish("users.archived", {"ids": chunk})
+            
+            if len(chunk) < chunk_size:
+                break
+        
+        return archived
+
+class CountCRUD:
+    """
+    عدد صفوف جدول users (الإجمالي أو حسب الحالة) بدون COUNT(*) لكل طلب
+    
+    - exact: من جدول user_counters الذي يُحدَّث في نفس معاملة كل كتابة
+    - estimate: reltuples من pg_class على PostgreSQL، أو عدد مخزّن مؤقتاً لكل مرشح
+    """
+    
+    @staticmethod
+    def key(status: str = None) -> str:
+        return "total" if status is None else f"status:{status}"
+    
+    @staticmethod
+    def cache_key(db: Session, key: str) -> str:
+        """
+        مفتاح count_cache للعداد في الـ shard (بدون بادئة في الـ shard الرئيسي)
+        """
+        shard = shard_of(db)
+        return key if shard == 0 else f"shard{shard}:{key}"
+    
+    @staticmethod
+    def bump(db: Session, total: int = 0, by_status: dict = None):
+        """
+        تعديل العدادات الموجودة دون حفظ (ضمن معاملة الكتابة)
+        
+        العداد غير الموجود بعد لا يُنشأ هنا، بل عند أول قراءة من COUNT(*).
+        الرد: المفاتيح المتأثرة ليتم إبطالها من count_cache بعد الحفظ
+        """
+        deltas = Counter({CountCRUD.key(): total})
+        for status, delta in (by_status or {}).items():
+            deltas[CountCRUD.key(status)] += delta
+        
+        keys = []
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+            db.execute(
+                update(models.UserCounter)
+                .where(models.UserCounter.key == key)
+                .values(value=models.UserCounter.value + delta)
+                .execution_options(synchronize_session=False)
+            )
+            keys.append(CountCRUD.cache_key(db, key))
+        return keys
+    
+    @staticmethod
+    def _count_query(status: str = None):
+        query = select(func.count()).select_from(models.User)
+        if status is not None:
+            query = query.where(models.User.status == status)
+        return query
+    
+    @staticmethod
+    def seed(db: Session, status: str = None):
+        """
+        إنشاء العداد من COUNT(*) مرة واحدة
+        
+        على PostgreSQL يُقفل جدول users بوضع SHARE أثناء العدّ حتى لا تضيع
+        كتابة متزامنة لم تجد العداد بعد. على SQLite الجملة الواحدة ذرية.
+        """
+        key = CountCRUD.key(status)
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            db.execute(text("LOCK TABLE users IN SHARE MODE"))
+        
+        # WHERE صريح مطلوب في SQLite قبل ON CONFLICT في INSERT ... SELECT
+        count_query = CountCRUD._count_query(status).add_columns(literal(key)).where(true())
+        if dialect in ("postgresql", "sqlite"):
+            insert_for = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert_for(models.UserCounter).from_select(
+                ["value", "key"], count_query
+            ).on_conflict_do_nothing(index_elements=["key"])
+        else:
+            stmt = insert(models.UserCounter).from_select(["value", "key"], count_query)
+        db.execute(stmt)
+        db.commit()
+        return db.get(models.UserCounter, key, populate_existing=True).value
+    
+    @staticmethod
+    def exact(db: Session, status: str = None) -> int:
+        counter = db.get(models.UserCounter, CountCRUD.key(status))
+        if counter is None:
+            return CountCRUD.seed(db, status)
+        return counter.value
+    
+    @staticmethod
+    def estimate(db: Session, status: str = None) -> int:
+        if status is None and db.get_bind().dialect.name == "postgresql":
+            reltuples = db.execute(text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass"
+            )).scalar()
+            # -1 يعني أن الجدول لم يُحلَّل بعد (ANALYZE)
+            if reltuples is not None and reltuples >= 0:
+                return reltuples
+        
+        key = CountCRUD.cache_key(db, CountCRUD.key(status))
+        value = count_cache.get(key)
+        if value is None:
+            generation = count_cache.generation(key)
+            value = db.execute(CountCRUD._count_query(status)).scalar()
+            count_cache.put(key, value, generation)
+        return value
+    
+    @staticmethod
+    def rebuild(db: Session):
+        """
+        إعادة حساب جميع العدادات من جدول users
+        """
+        db.query(models.UserCounter).delete(synchronize_session=False)
+        db.commit()
+        counts = {"total": CountCRUD.seed(db)}
+        for status in USER_STATUSES:
+            counts[status] = CountCRUD.seed(db, status)
+        count_cache.invalidate(*(
+            CountCRUD.cache_key(db, CountCRUD.key(status)) for status in (None,) + USER_STATUSES
+        ))
+        return counts
 
 class StatsCRUD:
     @staticmethod
@@ -111,6 +989,33 @@ class StatsCRUD:
         
         return stats
     
+    @staticmethod
+    def total_users(db: Session) -> int:
+        """
+        عدد المستخدمين المسجّل في الـ shard (بدون إنشاء صف الإحصائيات)
+        """
+        stats = db.query(models.RegistrationStats).first()
+        return stats.total_users if stats else 0
+    
+    @staticmethod
+    def increment_total_users(db: Session, count: int = 1):
+        """
+        زيادة عدد المستخدمين الإجمالي دون حفظ (ضمن معاملة المستدعي)
+        """
+        stats = db.query(models.RegistrationStats).first()
+        if stats:
+            stats.total_users += count
+            stats.last_updated = datetime.now()
+        else:
+            # إنشاء إحصائيات جديدة إذا لم تكن موجودة
+            stats = models.RegistrationStats(
+                total_users=count,
+                today_visits=1,
+                countries_count=1
+            )
+            db.add(stats)
+        return stats
+    
     @staticmethod
     def update_stats(db: Session, total_users: int = None, 
                      today_visits: int = None, countries_count: int = None):
@@ -135,3 +1040,562 @@ class StatsCRUD:
         db.refresh(stats)
         
         return stats
+
+
+def _to_utc_naive(moment: datetime) -> datetime:
+    """
+    توحيد التوقيت إلى UTC بدون منطقة زمنية (كما يُخزَّن في جداول التجميع)
+    """
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class RollupCRUD:
+    """
+    تجميعات التسجيلات الزمنية (registrations_hourly / registrations_daily)
+    """
+    BUCKETS = {
+        "hour": models.RegistrationHourly,
+        "day": models.RegistrationDaily,
+    }
+    
+    @staticmethod
+    def bucket_start(moment: datetime, bucket: str = "hour") -> datetime:
+        """
+        بداية الفترة (ساعة أو يوم) التي تقع فيها اللحظة المعطاة
+        """
+        moment = _to_utc_naive(moment).replace(minute=0, second=0, microsecond=0)
+        if bucket == "day":
+            moment = moment.replace(hour=0)
+        return moment
+    
+    @staticmethod
+    def apply_deltas(db: Session, deltas: Counter):
+        """
+        تطبيق فروقات العدّ على جداول التجميع دون حفظ (commit)
+        
+        deltas: Counter مفتاحه (بداية الساعة، الحالة) وقيمته مقدار التغيير
+        """
+        by_model = {}
+        for (hour_start, status), delta in deltas.items():
+            if not delta:
+                continue
+            for bucket, model in RollupCRUD.BUCKETS.items():
+                key = (RollupCRUD.bucket_start(hour_start, bucket), status)
+                by_model.setdefault(model, Counter())[key] += delta
+        
+        dialect = db.get_bind().dialect.name
+        for model, counts in by_model.items():
+            for (bucket_start, status), delta in counts.items():
+                if not delta:
+                    continue
+                if dialect in ("postgresql", "sqlite"):
+                    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                    stmt = insert(model).values(
+                        bucket_start=bucket_start, status=status, count=delta
+                    )
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["bucket_start", "status"],
+                        set_={"count": model.count + delta},
+                    )
+                    db.execute(stmt)
+                    continue
+                
+                # قواعد بيانات أخرى: تحديث ثم إدراج عند عدم وجود الصف
+                result = db.execute(
+                    update(model)
+                    .where(model.bucket_start == bucket_start, model.status == status)
+                    .values(count=model.count + delta)
+                )
+                if result.rowcount == 0:
+                    db.add(model(bucket_start=bucket_start, status=status, count=delta))
+                    db.flush()
+    
+    @staticmethod
+    def record_registration(db: Session, created_at: datetime, status: str):
+        """
+        احتساب تسجيل جديد في التجميعات (ضمن نفس المعاملة)
+        """
+        RollupCRUD.apply_deltas(db, Counter({
+            (RollupCRUD.bucket_start(created_at), status): 1
+        }))
+    
+    @staticmethod
+    def record_status_change(db: Session, user: models.User, old_status: str):
+        """
+        نقل التسجيل من حالته القديمة إلى الجديدة في فترة إنشائه
+        """
+        if old_status == user.status or user.created_at is None:
+            return
+        hour_start = RollupCRUD.bucket_start(user.created_at)
+        RollupCRUD.apply_deltas(db, Counter({
+            (hour_start, old_status): -1,
+            (hour_start, user.status): 1,
+        }))
+    
+    @staticmethod
+    def backfill(db: Session, chunk_size: int = 5000) -> int:
+        """
+        إعادة بناء جداول التجميع من جدول المستخدمين بالكامل
+        
+        يتم مسح الجداول وإعادة ملئها في معاملة واحدة، لذلك لا يرى القرّاء
+        جداول فارغة على PostgreSQL. يُفضّل تشغيلها في وقت قليل الحركة.
+        """
+        counts = Counter()
+        scanned = 0
+        rows = db.execute(
+            select(models.User.created_at, models.User.status)
+            .where(models.User.created_at.isnot(None))
+            .execution_options(yield_per=chunk_size)
+        )
+        for created_at, status in rows:
+            counts[(RollupCRUD.bucket_start(created_at), status)] += 1
+            scanned += 1
+        
+        for model in RollupCRUD.BUCKETS.values():
+            db.query(model).delete(synchronize_session=False)
+        RollupCRUD.apply_deltas(db, counts)
+        db.commit()
+        return scanned
+    
+    @staticmethod
+    def timeseries(db: Session, start: datetime, end: datetime, bucket: str = "hour"):
+        """
+        سلسلة التسجيلات الزمنية بصيغة عمودية مضغوطة
+        
+        تُعاد الفترات التي فيها تسجيلات فقط:
+        {"timestamps": [...], "counts": {"pending": [...], ...}, "total": [...]}
+        """
+        return RollupCRUD.pack_timeseries(
+            RollupCRUD.timeseries_rows(db, start, end, bucket), start, end, bucket
+        )
+    
+    @staticmethod
+    def timeseries_rows(db: Session, start: datetime, end: datetime, bucket: str = "hour"):
+        """
+        صفوف التجميع (bucket_start, status, count) مرتبة حسب بداية الفترة
+        """
+        model = RollupCRUD.BUCKETS[bucket]
+        return db.execute(
+            select(model.bucket_start, model.status, model.count)
+            .where(
+                model.bucket_start >= RollupCRUD.bucket_start(start, bucket),
+                model.bucket_start < _to_utc_naive(end),
+                model.count != 0,
+            )
+            .order_by(model.bucket_start)
+        ).all()
+    
+    @staticmethod
+    def pack_timeseries(rows, start: datetime, end: datetime, bucket: str = "hour"):
+        """
+        تحويل الصفوف المرتبة إلى الصيغة العمودية (الصفوف المتكررة لنفس
+        الفترة والحالة، كالقادمة من عدة shards، تُجمع)
+        """
+        timestamps = []
+        counts = {status: [] for status in USER_STATUSES}
+        total = []
+        for bucket_start, status, count in rows:
+            if not timestamps or timestamps[-1] != bucket_start:
+                timestamps.append(bucket_start)
+                total.append(0)
+                for column in counts.values():
+                    column.append(0)
+            if status not in counts:
+                counts[status] = [0] * len(timestamps)
+            counts[status][-1] += count
+            total[-1] += count
+        
+        return {
+            "bucket": bucket,
+            "from": _to_utc_naive(start).isoformat(),
+            "to": _to_utc_naive(end).isoformat(),
+            "timestamps": [moment.isoformat() for moment in timestamps],
+            "counts": counts,
+            "total": total,
+        }
+
+
+def _newest_first(created_at_index: int):
+    """
+    مفتاح دمج الصفوف من الأحدث حسب created_at (الصفوف بدون تاريخ في النهاية)
+    """
+    def key(row):
+        created_at = row[created_at_index]
+        return (created_at is not None, created_at or 0)
+    return key
+
+
+class ShardCRUD:
+    """
+    العمليات على عدة shards: تُنفذ على كل shard بالتوازي ثم تُدمج النتائج
+    
+    القوائم المرتبة تُدمج بدمج k-way على created_at (heapq.merge)، والأعداد
+    تُجمع. مع shard واحد تُستدعى الدوال الأصلية مباشرة.
+    """
+    
+    @staticmethod
+    async def for_ids(shards: ShardSessions, user_ids: list, fn):
+        """
+        تنفيذ fn(db, معرفات الـ shard) لكل shard فيه معرفات من القائمة
+        """
+        groups = shards.group_ids(user_ids)
+        return await shards.gather([
+            shards.call(shard, fn, ids) for shard, ids in groups.items()
+        ])
+    
+    @staticmethod
+    async def list_rows(shards: ShardSessions, fields: tuple, skip: int = 0,
+                        limit: int = 100, status: str = None):
+        """
+        صفحة من المستخدمين الأحدث عبر كل الـ shards
+        
+        كل shard يُرجع أحدث skip + limit صفاً ثم تُقطع الصفحة من الدمج، لذلك
+        تكلفة الصفحات العميقة تتضاعف بعدد الـ shards.
+        """
+        if shards.count == 1:
+            return await shards.call(
+                0, UserCRUD.list_rows, fields, skip=skip, limit=limit, status=status
+            )
+        
+        query_fields = fields if "created_at" in fields else fields + ("created_at",)
+        results = await shards.fan_out(
+            UserCRUD.list_rows, query_fields, skip=0, limit=skip + limit, status=status
+        )
+        merged = heapq.merge(
+            *results, key=_newest_first(query_fields.index("created_at")), reverse=True
+        )
+        return [tuple(row)[:len(fields)] for row in islice(merged, skip, skip + limit)]
+    
+    @staticmethod
+    async def search_rows(shards: ShardSessions, text_query: str, fields: tuple):
+        results = await shards.fan_out(UserCRUD.search_rows, text_query, fields)
+        return list(chain.from_iterable(results))
+    
+    @staticmethod
+    def export_rows(fields: tuple, status: str = None, chunk_size: int = 1000):
+        """
+        كل المستخدمين من جميع الـ shards من الأحدث، كمولّد للبث التدريجي
+        
+        لكل shard جلسة ومؤشر يُقرأ على دفعات، والدمج k-way يسحب من المؤشرات
+        حسب الحاجة فلا يُحمَّل أي جدول في الذاكرة.
+        """
+        query_fields = fields if "created_at" in fields else fields + ("created_at",)
+        sessions = [factory() for factory in shard_session_factories]
+        try:
+            streams = [
+                UserCRUD.export_rows(db, query_fields, status, chunk_size) for db in sessions
+            ]
+            merged = heapq.merge(
+                *streams, key=_newest_first(query_fields.index("created_at")), reverse=True
+            )
+            for row in merged:
+                yield tuple(row)[:len(fields)]
+        finally:
+            for db in sessions:
+                db.close()
+    
+    @staticmethod
+    def suggest_rows(chunk_size: int = 5000):
+        """
+        صفوف فهرس الإكمال من كل الـ shards تباعاً (قراءة متدفقة)
+        """
+        for session_factory in shard_session_factories:
+            db = session_factory()
+            try:
+                yield from UserCRUD.suggest_rows(db, chunk_size)
+            finally:
+                db.close()
+    
+    @staticmethod
+    async def count_users(shards: ShardSessions, mode: str, status: str = None) -> int:
+        """
+        مجموع أعداد المستخدمين (exact أو estimate) في كل الـ shards
+        """
+        count = CountCRUD.exact if mode == "exact" else CountCRUD.estimate
+        return sum(await shards.fan_out(count, status))
+    
+    @staticmethod
+    async def summary_counts(shards: ShardSessions):
+        counts = Counter()
+        for shard_counts in await shards.fan_out(UserCRUD.summary_counts):
+            counts.update(shard_counts)
+        return counts
+    
+    @staticmethod
+    async def bulk_update_status(shards: ShardSessions, status: str, user_ids: list = None,
+                                 current_status: str = None, created_before: datetime = None):
+        """
+        التحديث الجماعي للحالة في كل shard (المعرفات مجمعة حسب الـ shard)
+        """
+        if user_ids is not None:
+            partials = await ShardCRUD.for_ids(
+                shards, user_ids,
+                lambda db, ids: UserCRUD.bulk_update_status(db, status, user_ids=ids)
+            )
+        else:
+            partials = await shards.fan_out(
+                UserCRUD.bulk_update_status, status,
+                current_status=current_status, created_before=created_before
+            )
+        
+        results = {"updated": [], "unchanged": [], "not_found": []}
+        for partial in partials:
+            for outcome, ids in partial.items():
+                results[outcome].extend(ids)
+        if user_ids is not None and len(partials) > 1:
+            # نفس ترتيب المعرفات في الطلب
+            position = {user_id: i for i, user_id in reversed(list(enumerate(user_ids)))}
+            for ids in results.values():
+                ids.sort(key=position.get)
+        return results
+    
+    @staticmethod
+    async def claim_review(shards: ShardSessions, moderator: str, count: int, lease_seconds: int):
+        """
+        حجز أقدم N طلبات معلقة عبر كل الـ shards
+        
+        تُقرأ أقدم N طلبات غير محجوزة من كل shard وتُدمج، ثم يحجز كل shard
+        حصته فقط، فلا تُحجز طلبات زائدة تحتاج إلى إلغاء.
+        """
+        if shards.count == 1:
+            return await shards.call(0, ReviewQueueCRUD.claim, moderator, count, lease_seconds)
+        
+        candidates = await shards.fan_out(ReviewQueueCRUD.peek, count)
+        oldest = heapq.merge(*(
+            [(tuple(row), shard) for row in rows] for shard, rows in enumerate(candidates)
+        ))
+        quotas = Counter(shard for _, shard in islice(oldest, count))
+        claimed = await shards.gather([
+            shards.call(shard, ReviewQueueCRUD.claim, moderator, quota, lease_seconds)
+            for shard, quota in quotas.items()
+        ])
+        return sorted(chain.from_iterable(claimed), key=lambda user: (user.created_at, user.id))
+    
+    @staticmethod
+    async def renew_review(shards: ShardSessions, moderator: str, user_ids: list,
+                           lease_seconds: int):
+        renewed = await ShardCRUD.for_ids(
+            shards, user_ids,
+            lambda db, ids: ReviewQueueCRUD.renew(db, moderator, ids, lease_seconds)
+        )
+        return list(chain.from_iterable(renewed))
+    
+    @staticmethod
+    async def release_review(shards: ShardSessions, moderator: str, user_ids: list):
+        released = await ShardCRUD.for_ids(
+            shards, user_ids,
+            lambda db, ids: ReviewQueueCRUD.release(db, moderator, ids)
+        )
+        return list(chain.from_iterable(released))
+    
+    @staticmethod
+    async def timeseries(shards: ShardSessions, start: datetime, end: datetime,
+                         bucket: str = "hour"):
+        """
+        السلسلة الزمنية من تجميعات كل الـ shards (تُجمع الفترات المتطابقة)
+        """
+        results = await shards.fan_out(RollupCRUD.timeseries_rows, start, end, bucket)
+        rows = heapq.merge(*results, key=lambda row: row[0])
+        return RollupCRUD.pack_timeseries(rows, start, end, bucket)
+    
+    @staticmethod
+    async def outbox_counts(shards: ShardSessions):
+        counts = {}
+        for shard_counts in await shards.fan_out(OutboxCRUD.counts):
+            for handler, by_status in shard_counts.items():
+                merged = counts.setdefault(handler, {})
+                for status, count in by_status.items():
+                    merged[status] = merged.get(status, 0) + count
+        return counts
+    
+    @staticmethod
+    async def get_stats(shards: ShardSessions):
+        """
+        الإحصائيات العامة: الزيارات والدول من الـ shard الرئيسي، وعدد
+        المستخدمين مجموع كل الـ shards (كل shard يحدّث عدده في معاملة صندوقه)
+        
+        الرد: (صف الإحصائيات الرئيسي، إجمالي المستخدمين)
+        """
+        stats = StatsCRUD.get_stats(shards.get(0))
+        total_users = stats.total_users
+        if shards.count > 1:
+            others = await shards.gather([
+                shards.call(shard, StatsCRUD.total_users) for shard in range(1, shards.count)
+            ])
+            total_users += sum(others)
+        return stats, total_users
+    
+    @staticmethod
+    async def update_stats(shards: ShardSessions, total_users: int = None,
+                           today_visits: int = None, countries_count: int = None):
+        """
+        تحديث الإحصائيات؛ total_users هو الإجمالي المطلوب لكل الـ shards
+        
+        الرد: (صف الإحصائيات الرئيسي، إجمالي المستخدمين)
+        """
+        others = 0
+        if shards.count > 1:
+            others = sum(await shards.gather([
+                shards.call(shard, StatsCRUD.total_users) for shard in range(1, shards.count)
+            ]))
+        stats = StatsCRUD.update_stats(
+            shards.get(0),
+            total_users=None if total_users is None else total_users - others,
+            today_visits=today_visits,
+            countries_count=countries_count
+        )
+        return stats, stats.total_users + others
+
+
+class RebalanceCRUD:
+    """
+    إعادة توزيع الدلاء عند زيادة عدد الـ shards (python -m app.jobs rebalance-shards)
+    
+    كل shard قديم يُقرأ مرة واحدة بترقيم المفاتيح، والصفوف التي تغيّر shard
+    دلوها تُنسخ إلى الـ shard الجديد ثم تُحذف من القديم. النسخ يتجاهل الصفوف
+    الموجودة مسبقاً، لذلك يمكن إعادة التشغيل بأمان بعد أي انقطاع.
+    التجميعات الزمنية وصندوق الصادر تبقى مكانها (المجاميع عبر الـ shards لا تتغير).
+    """
+    
+    @staticmethod
+    def _copy_missing(db: Session, model, rows: list, key: str) -> list:
+        """
+        إدراج الصفوف غير الموجودة في الـ shard الهدف (بدون commit)
+        
+        الرد: الصفوف التي أُدرجت فعلاً
+        """
+        column = getattr(model, key)
+        existing = set(db.execute(
+            select(column).where(column.in_([row[key] for row in rows]))
+        ).scalars())
+        missing = [dict(row) for row in rows if row[key] not in existing]
+        if missing:
+            db.execute(insert(model.__table__), missing)
+        return missing
+    
+    @staticmethod
+    def _scan(db: Session, model, key: str, chunk_size: int):
+        """
+        كل صفوف الجدول على دفعات مرتبة بالمفتاح (id > آخر قيمة)
+        """
+        column = getattr(model, key)
+        last = None
+        while True:
+            query = select(model.__table__).order_by(column).limit(chunk_size)
+            if last is not None:
+                query = query.where(column > last)
+            rows = db.execute(query).mappings().all()
+            if not rows:
+                return
+            last = rows[-1][key]
+            yield rows
+    
+    @staticmethod
+    def move_registry(sessions: list, source: int, shard_count: int,
+                      chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        نقل صفوف registered_emails إلى shard دلو البريد، وإضافة صف لكل مستخدم
+        ليس له صف بعد (المستخدمون القدامى قد يبقون في shard مختلف عن دلو بريدهم)
+        """
+        db = sessions[source]
+        moved = 0
+        
+        for rows in RebalanceCRUD._scan(db, models.RegisteredEmail, "email", chunk_size):
+            by_target = {}
+            for row in rows:
+                target = bucket_shard(email_bucket(row["email"]), shard_count)
+                if target != source:
+                    by_target.setdefault(target, []).append(row)
+            for target, target_rows in by_target.items():
+                RebalanceCRUD._copy_missing(sessions[target], models.RegisteredEmail,
+                                            target_rows, "email")
+                sessions[target].commit()
+                db.execute(
+                    delete(models.RegisteredEmail)
+                    .where(models.RegisteredEmail.email.in_([row["email"] for row in target_rows]))
+                    .execution_options(synchronize_session=False)
+                )
+                moved += len(target_rows)
+            db.commit()
+        
+        for rows in RebalanceCRUD._scan(db, models.User, "id", chunk_size):
+            by_target = {}
+            for row in rows:
+                target = bucket_shard(email_bucket(row["email"]), shard_count)
+                by_target.setdefault(target, []).append(
+                    {"email": row["email"], "user_id": row["id"]}
+                )
+            for target, registry_rows in by_target.items():
+                RebalanceCRUD._copy_missing(sessions[target], models.RegisteredEmail,
+                                            registry_rows, "email")
+                sessions[target].commit()
+        
+        return moved
+    
+    @staticmethod
+    def move_rows(sessions: list, source: int, shard_count: int,
+                  chunk_size: int = BULK_CHUNK_SIZE) -> dict:
+        """
+        نقل المستخدمين والأرشيف وتسلسلات المعرفات إلى shard دلو المعرف
+        
+        الرد: عدد الصفوف المنقولة لكل جدول
+        """
+        db = sessions[source]
+        moved = Counter()
+        
+        for model in (models.User, models.UserArchive):
+            for rows in RebalanceCRUD._scan(db, model, "id", chunk_size):
+                by_target = {}
+                for row in rows:
+                    target = bucket_shard(id_bucket(row["id"]), shard_count)
+                    if target != source:
+                        by_target.setdefault(target, []).append(row)
+                
+                for target, target_rows in by_target.items():
+                    # الـ shard الجديد لا يحوي إلا الجدول الأب للأرشيف المقسّم
+                    partitions = set()
+                    if model is models.UserArchive:
+                        partitions = ArchiveCRUD.ensure_partitions_for(
+                            sessions[target], [row["created_at"] for row in target_rows]
+                        )
+                    inserted = RebalanceCRUD._copy_missing(
+                        sessions[target], model, target_rows, "id"
+                    )
+                    if model is models.User and inserted:
+                        CountCRUD.bump(sessions[target], total=len(inserted),
+                                       by_status=Counter(row["status"] for row in inserted))
+                    sessions[target].commit()
+                    ArchiveCRUD._partitions.update(partitions)
+                    
+                    db.execute(
+                        delete(model)
+                        .where(model.id.in_([row["id"] for row in target_rows]))
+                        .execution_options(synchronize_session=False)
+                    )
+                    if model is models.User:
+                        CountCRUD.bump(db, total=-len(target_rows), by_status={
+                            status: -count
+                            for status, count in Counter(row["status"] for row in target_rows).items()
+                        })
+                    moved[model.__tablename__] += len(target_rows)
+                db.commit()
+        
+        # صف تسلسل الدلو ينتقل مع مستخدميه
+        for rows in RebalanceCRUD._scan(db, models.IdSequence, "bucket", chunk_size):
+            for row in rows:
+                target = bucket_shard(row["bucket"], shard_count)
+                if target == source:
+                    continue
+                RebalanceCRUD._copy_missing(sessions[target], models.IdSequence, [row], "bucket")
+                sessions[target].commit()
+                db.execute(
+                    delete(models.IdSequence)
+                    .where(models.IdSequence.bucket == row["bucket"])
+                    .execution_options(synchronize_session=False)
+                )
+                moved[models.IdSequence.__tablename__] += 1
+            db.commit()
+        
+        return dict(moved)
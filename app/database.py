@@ -1,19 +1,166 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import asyncio
+import hashlib
 import os
 
+from app.core.config import settings
+
 # استخدام قاعدة بيانات PostgreSQL على Railway أو SQLite محلياً
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./registration.db")
 
-# تعديل URL ليكون متوافقاً مع PostgreSQL على Railway
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL and DATABASE_URL.startswith("sqlite") else {}
-)
+def normalize_url(url: str) -> str:
+    # تعديل URL ليكون متوافقاً مع PostgreSQL على Railway
+    if url and url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def make_engine(url: str):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url and url.startswith("sqlite") else {}
+    )
+
+
+DATABASE_URL = normalize_url(DATABASE_URL)
+
+# ======================
+# التقسيم الأفقي (Sharding)
+# ======================
+# كل مستخدم يُوجَّه إلى قاعدة بيانات (shard) حسب بصمة ثابتة لبريده.
+# البريد يقع في أحد NUM_BUCKETS دلواً منطقياً (عدد ثابت لا يتغير)، والدلو
+# يُسند إلى shard بالقاعدة bucket % عدد الـ shards. المعرف العام للمستخدم
+# يحمل دلوه: id = التسلسل * NUM_BUCKETS + الدلو، فيُعرف الـ shard من المعرف.
+#
+# بدون SHARD_URLS يوجد shard واحد فقط هو DATABASE_URL. ومع SHARD_URLS يكون
+# أولها قاعدة البيانات الرئيسية (engine / SessionLocal).
+NUM_BUCKETS = 256
+
+SHARD_URLS = [normalize_url(url) for url in settings.SHARD_URLS] or [DATABASE_URL]
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+shard_engines = [make_engine(url) for url in SHARD_URLS]
+shard_session_factories = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine, info={"shard": index})
+    for index, shard_engine in enumerate(shard_engines)
+]
+
+engine = shard_engines[0]
+SessionLocal = shard_session_factories[0]
 Base = declarative_base()
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def email_bucket(email: str) -> int:
+    """
+    الدلو المنطقي للبريد (blake2b ثابت بين العمليات والإصدارات بخلاف hash())
+    """
+    digest = hashlib.blake2b(normalize_email(email).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % NUM_BUCKETS
+
+
+def id_bucket(user_id: int) -> int:
+    return user_id % NUM_BUCKETS
+
+
+def make_user_id(sequence: int, bucket: int) -> int:
+    return sequence * NUM_BUCKETS + bucket
+
+
+def bucket_shard(bucket: int, shard_count: int = None) -> int:
+    return bucket % (shard_count or len(shard_engines))
+
+
+def shard_for_email(email: str) -> int:
+    return bucket_shard(email_bucket(email))
+
+
+def shard_for_id(user_id: int) -> int:
+    return bucket_shard(id_bucket(user_id))
+
+
+def shard_of(db) -> int:
+    """
+    رقم الـ shard الذي تتصل به الجلسة
+    """
+    return db.info.get("shard", 0)
+
+
+class ShardSessions:
+    """
+    جلسات الـ shards لطلب واحد؛ كل جلسة تُفتح عند أول استخدام
+    
+    العمليات على عدة shards تُنفذ بالتوازي عبر fan_out (كل shard في خيط)،
+    ومع shard واحد تُنفذ مباشرة كما في السابق.
+    """
+    
+    def __init__(self):
+        self._sessions = {}
+    
+    @property
+    def count(self) -> int:
+        return len(shard_session_factories)
+    
+    def get(self, shard: int):
+        session = self._sessions.get(shard)
+        if session is None:
+            session = shard_session_factories[shard]()
+            self._sessions[shard] = session
+        return session
+    
+    def for_email(self, email: str):
+        return self.get(shard_for_email(email))
+    
+    def for_user_id(self, user_id: int):
+        return self.get(shard_for_id(user_id))
+    
+    def group_ids(self, user_ids) -> dict:
+        """
+        تقسيم المعرفات حسب الـ shard مع الحفاظ على ترتيبها
+        """
+        groups = {}
+        for user_id in dict.fromkeys(user_ids):
+            groups.setdefault(shard_for_id(user_id), []).append(user_id)
+        return groups
+    
+    async def call(self, shard: int, fn, *args, **kwargs):
+        """
+        تنفيذ fn(session, ...) على shard واحد (في خيط عند وجود عدة shards)
+        """
+        session = self.get(shard)
+        if self.count == 1:
+            return fn(session, *args, **kwargs)
+        return await asyncio.to_thread(fn, session, *args, **kwargs)
+    
+    async def gather(self, calls):
+        """
+        انتظار عدة استدعاءات call() معاً، وإعادة أول خطأ بعد انتهائها جميعاً
+        (حتى لا تُستخدم جلسة في خيط بعد التراجع عنها)
+        """
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+    
+    async def fan_out(self, fn, *args, **kwargs) -> list:
+        """
+        تنفيذ fn(session, ...) على كل الـ shards بالتوازي (النتائج بترتيب الـ shards)
+        """
+        return await self.gather(
+            [self.call(shard, fn, *args, **kwargs) for shard in range(self.count)]
+        )
+    
+    def rollback(self):
+        for session in self._sessions.values():
+            session.rollback()
+    
+    def close(self):
+        for session in self._sessions.values():
+            session.close()
+        self._sessions = {}
@@ -0,0 +1,160 @@
+# app/jobs.py
+"""
+مهام الصيانة التي تُشغَّل من سطر الأوامر
+
+الاستخدام:
+    python -m app.jobs backfill-rollups
+    python -m app.jobs drain-outbox
+    python -m app.jobs archive --days 30
+    python -m app.jobs rebuild-counts
+    python -m app.jobs rebalance-shards --to URL0 URL1 ...
+
+المهام تمر على كل الـ shards المحددة في SHARD_URLS.
+"""
+
+import argparse
+import sys
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, workers
+from app.database import (
+    Base, NUM_BUCKETS, SHARD_URLS, bucket_shard, make_engine, normalize_url, shard_engines,
+    shard_session_factories,
+)
+
+
+def create_tables():
+    for shard_engine in shard_engines:
+        Base.metadata.create_all(bind=shard_engine)
+
+
+def backfill_rollups(args):
+    """
+    إعادة بناء جداول التجميع الزمنية من جدول المستخدمين
+    """
+    create_tables()
+    for shard, session_factory in enumerate(shard_session_factories):
+        db = session_factory()
+        try:
+            scanned = crud.RollupCRUD.backfill(db, chunk_size=args.chunk_size)
+            print(f"📊 shard {shard}: تمت إعادة بناء التجميعات من {scanned} مستخدم")
+        finally:
+            db.close()
+
+
+def drain_outbox(args):
+    """
+    معالجة أحداث صندوق الصادر الجاهزة حتى يفرغ
+    """
+    create_tables()
+    processed = 0
+    for shard in range(len(shard_session_factories)):
+        while True:
+            claimed = workers.process_batch("jobs:drain-outbox", args.batch_size, shard)
+            processed += claimed
+            if claimed == 0:
+                break
+    print(f"📬 تمت معالجة {processed} حدث من صندوق الصادر")
+
+
+def archive_users(args):
+    """
+    نقل المستخدمين غير النشطين ومن تم البت فيهم إلى الأرشيف
+    """
+    create_tables()
+    archived = workers.run_archive(args.days, args.chunk_size)
+    print(f"🗄️ تمت أرشفة {archived} مستخدم")
+
+
+def rebuild_counts(args):
+    """
+    إعادة حساب عدادات جدول المستخدمين من COUNT(*)
+    """
+    create_tables()
+    for shard, session_factory in enumerate(shard_session_factories):
+        db = session_factory()
+        try:
+            counts = crud.CountCRUD.rebuild(db)
+            print(f"🔢 shard {shard}: تمت إعادة حساب العدادات: {counts}")
+        finally:
+            db.close()
+
+
+def rebalance_shards(args):
+    """
+    نقل الدلاء إلى عدد أكبر من الـ shards
+    
+    --to هي القائمة الجديدة كاملة وتبدأ بالـ shards الحالية بنفس الترتيب.
+    يجب إيقاف التطبيق والعمال أثناء النقل، ثم ضبط SHARD_URLS على القائمة
+    الجديدة. يمكن إعادة التشغيل بأمان إذا توقفت العملية في منتصفها.
+    """
+    new_urls = [normalize_url(url) for url in args.to]
+    if len(new_urls) <= len(SHARD_URLS) or new_urls[:len(SHARD_URLS)] != SHARD_URLS:
+        print("❌ يجب أن تبدأ القائمة الجديدة بالـ shards الحالية وأن تكون أطول منها:")
+        print(f"   الحالية: {SHARD_URLS}")
+        return 1
+    
+    old_count, new_count = len(SHARD_URLS), len(new_urls)
+    moving = [
+        bucket for bucket in range(NUM_BUCKETS)
+        if bucket_shard(bucket, old_count) != bucket_shard(bucket, new_count)
+    ]
+    print(f"🔀 {len(moving)} من {NUM_BUCKETS} دلواً تنتقل من {old_count} إلى {new_count} shard")
+    if args.dry_run:
+        return 0
+    
+    engines = shard_engines + [make_engine(url) for url in new_urls[old_count:]]
+    sessions = []
+    for shard, shard_engine in enumerate(engines):
+        Base.metadata.create_all(bind=shard_engine)
+        sessions.append(sessionmaker(
+            autocommit=False, autoflush=False, bind=shard_engine, info={"shard": shard}
+        )())
+    try:
+        for source in range(old_count):
+            moved = crud.RebalanceCRUD.move_registry(sessions, source, new_count, args.chunk_size)
+            print(f"📧 shard {source}: نُقل {moved} بريد مسجل")
+        for source in range(old_count):
+            moved = crud.RebalanceCRUD.move_rows(sessions, source, new_count, args.chunk_size)
+            print(f"📦 shard {source}: {moved or 'لا صفوف للنقل'}")
+    finally:
+        for db in sessions:
+            db.close()
+    
+    print("✅ اكتمل النقل. اضبط SHARD_URLS على القائمة الجديدة ثم أعد تشغيل التطبيق")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    backfill = commands.add_parser("backfill-rollups", help="إعادة بناء تجميعات التسجيلات")
+    backfill.add_argument("--chunk-size", type=int, default=5000)
+    backfill.set_defaults(handler=backfill_rollups)
+    
+    drain = commands.add_parser("drain-outbox", help="معالجة صندوق الصادر حتى يفرغ")
+    drain.add_argument("--batch-size", type=int, default=100)
+    drain.set_defaults(handler=drain_outbox)
+    
+    archive = commands.add_parser("archive", help="أرشفة المستخدمين غير النشطين ومن تم البت فيهم")
+    archive.add_argument("--days", type=int, default=None)
+    archive.add_argument("--chunk-size", type=int, default=None)
+    archive.set_defaults(handler=archive_users)
+    
+    counts = commands.add_parser("rebuild-counts", help="إعادة حساب عدادات المستخدمين")
+    counts.set_defaults(handler=rebuild_counts)
+    
+    rebalance = commands.add_parser("rebalance-shards", help="نقل الدلاء إلى عدد أكبر من الـ shards")
+    rebalance.add_argument("--to", nargs="+", required=True, metavar="URL")
+    rebalance.add_argument("--chunk-size", type=int, default=500)
+    rebalance.add_argument("--dry-run", action="store_true")
+    rebalance.set_defaults(handler=rebalance_shards)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
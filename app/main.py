@@ -2,12 +2,16 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from datetime import datetime
+import asyncio
 import logging
 import sys
 
 from app.core.config import settings
-from app.database import engine, Base
-from app.api.endpoints import users, stats
+from app.database import shard_engines, Base
+from app.api.endpoints import users, stats, review_queue, events, debug
+from app.core.profiling import RequestProfilingMiddleware, profiling_enabled
+from app.core.events import broadcaster
+from app.workers import outbox_pool, archive_scheduler, load_suggest_index
 
 # إعداد التسجيل
 logging.basicConfig(level=logging.INFO)
@@ -35,13 +39,21 @@ app.add_middleware(
 async def startup_event():
     """إنشاء الجداول عند بدء التطبيق"""
     logger.info("🚀 بدء تشغيل منصة التسجيل...")
-    Base.metadata.create_all(bind=engine)
-    logger.info("✅ تم إنشاء الجداول في قاعدة البيانات")
+    for shard_engine in shard_engines:
+        Base.metadata.create_all(bind=shard_engine)
+    logger.info(f"✅ تم إنشاء الجداول في قواعد البيانات ({len(shard_engines)} shard)")
+    broadcaster.start(asyncio.get_running_loop())
+    outbox_pool.start()
+    archive_scheduler.start()
+    if settings.SUGGEST_INDEX_ENABLED:
+        app.state.suggest_loader = asyncio.create_task(load_suggest_index())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """التنظيف عند إيقاف التطبيق"""
     logger.info("🛑 إيقاف منصة التسجيل...")
+    await outbox_pool.stop()
+    await archive_scheduler.stop()
 
 # صفحة الترحيب
 @app.get("/")
@@ -72,6 +84,17 @@ async def health_check():
 # تسجيل نقاط API
 app.include_router(users.router, prefix="/api", tags=["المستخدمين"])
 app.include_router(stats.router, prefix="/api", tags=["الإحصائيات"])
+app.include_router(review_queue.router, prefix="/api", tags=["قائمة المراجعة"])
+app.include_router(events.router, prefix="/api", tags=["البث المباشر"])
+
+# أدوات التشخيص: لا تُضاف إطلاقاً عند التعطيل (بدون أي تكلفة)
+if profiling_enabled():
+    app.add_middleware(
+        RequestProfilingMiddleware,
+        token=settings.PROFILING_TOKEN,
+        interval=settings.PROFILING_INTERVAL_MS / 1000
+    )
+    app.include_router(debug.router, prefix="/debug", tags=["التشخيص"])
 
 # معالج الأخطاء العام
 @app.exception_handler(Exception)
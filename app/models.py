@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index, literal_column
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -11,8 +11,70 @@ class User(Base):
     phone = Column(String(20), nullable=True)
     is_active = Column(Boolean, default=True)
     status = Column(String(20), default="pending")  # pending, approved, rejected
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # حجز المراجعة: المشرف الذي يراجع الطلب وانتهاء مهلة الحجز
+    claimed_by = Column(String(100), nullable=True)
+    claim_expires_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # جلب القيم الافتراضية من الخادم (created_at) مع INSERT ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
+    # عدم إعادة استخدام المعرفات على SQLite بعد نقل الصفوف إلى الأرشيف
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# شرط قائمة المراجعة بقيمة ثابتة (وليس معاملاً) حتى يطابق شرط الفهرس الجزئي
+PENDING_QUEUE_CLAUSE = User.status == literal_column("'pending'")
+
+# فهرس جزئي على الطلبات المعلقة فقط مرتب حسب تاريخ الإنشاء
+Index(
+    "ix_users_pending_queue",
+    User.created_at,
+    User.id,
+    postgresql_where=PENDING_QUEUE_CLAUSE,
+    sqlite_where=PENDING_QUEUE_CLAUSE,
+)
+
+# أرشيف المستخدمين (البيانات الباردة): المحذوفون منطقياً ومن تم البت في طلبهم
+# منذ أكثر من ARCHIVE_AFTER_DAYS يوماً. على PostgreSQL الجدول مقسّم حسب
+# created_at (قسم لكل سنة)، لذلك المفتاح الأساسي يشمل created_at.
+class UserArchive(Base):
+    __tablename__ = "users_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    name = Column(String(100), nullable=False)
+    email = Column(String(255), index=True, nullable=False)
+    phone = Column(String(20), nullable=True)
+    is_active = Column(Boolean, default=True)
+    status = Column(String(20), default="pending")
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+# سجل البريد الإلكتروني: يضمن عدم تكرار البريد بين users و users_archive
+# (الجدول المقسّم لا يدعم فهرساً فريداً على email وحده)
+class RegisteredEmail(Base):
+    __tablename__ = "registered_emails"
+    
+    email = Column(String(255), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+
+# تسلسل المعرفات لكل دلو منطقي (انظر app/database.py): صف الدلو يوجد في
+# نفس الـ shard الذي يحمل مستخدميه، وينتقل معهم عند إعادة التوزيع
+class IdSequence(Base):
+    __tablename__ = "id_sequences"
+    
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+    next_seq = Column(Integer, nullable=False)
+
+# عدادات صفوف جدول users (total و status:<الحالة>) تُحدَّث مع كل كتابة
+class UserCounter(Base):
+    __tablename__ = "user_counters"
+    
+    key = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
 
 class RegistrationStats(Base):
     __tablename__ = "registration_stats"
@@ -21,4 +83,49 @@ class RegistrationStats(Base):
     total_users = Column(Integer, default=0)
     today_visits = Column(Integer, default=0)
     countries_count = Column(Integer, default=0)
-    last_updated = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    last_updated = Column(DateTime(timezone=True), server_default=func.now())
+
+# تجميعات التسجيلات حسب الساعة واليوم والحالة (بتوقيت UTC)
+# تُحدَّث تدريجياً عند التسجيل وتغيير الحالة، وتُعاد بناؤها بالكامل عبر:
+#   python -m app.jobs backfill-rollups
+class RegistrationHourly(Base):
+    __tablename__ = "registrations_hourly"
+    
+    bucket_start = Column(DateTime, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class RegistrationDaily(Base):
+    __tablename__ = "registrations_daily"
+    
+    bucket_start = Column(DateTime, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+# صندوق الصادر (Transactional Outbox): يُكتب مع صف المستخدم في نفس المعاملة
+# ويعالجه العمال لاحقاً، صف لكل معالج (stats, email, webhook)
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String(50), nullable=False)
+    handler = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+OUTBOX_PENDING_CLAUSE = OutboxEvent.status == literal_column("'pending'")
+
+Index(
+    "ix_outbox_pending",
+    OutboxEvent.available_at,
+    OutboxEvent.id,
+    postgresql_where=OUTBOX_PENDING_CLAUSE,
+    sqlite_where=OUTBOX_PENDING_CLAUSE,
+)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 # نموذج التسجيل
@@ -30,6 +30,27 @@ class UserResponse(BaseModel):
     class Config:
         orm_mode = True  # تغيير from_attributes إلى orm_mode في Pydantic 1.x
 
+# نموذج التحديث الجماعي للحالة
+class BulkStatusFilter(BaseModel):
+    status: Optional[str] = None
+    created_before: Optional[datetime] = None
+
+class BulkStatusUpdate(BaseModel):
+    status: str
+    user_ids: Optional[List[int]] = None
+    filter: Optional[BulkStatusFilter] = None
+
+# نماذج قائمة المراجعة
+class ReviewClaimRequest(BaseModel):
+    moderator: str = Field(..., min_length=1, max_length=100)
+    count: int = Field(10, ge=1, le=100)
+    lease_seconds: Optional[int] = Field(None, ge=1)
+
+class ReviewLeaseRequest(BaseModel):
+    moderator: str = Field(..., min_length=1, max_length=100)
+    user_ids: List[int] = Field(..., min_items=1, max_items=100)
+    lease_seconds: Optional[int] = Field(None, ge=1)
+
 # نموذج الإحصائيات
 class StatsResponse(BaseModel):
     total_users: int
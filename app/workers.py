@@ -0,0 +1,265 @@
+# app/workers.py
+"""
+عمال صندوق الصادر ومعالجات الأعمال اللاحقة للتسجيل
+
+- stats: تحديث الإحصائيات (في نفس معاملة تعليم الحدث كمنجز، لذلك تُطبّق
+  مرة واحدة فقط). التجميعات الزمنية تُحدَّث مع التسجيل نفسه في crud.
+- email: رسالة تأكيد عبر SMTP (خادم محلي في التطوير)
+- webhook: إرسال الحدث إلى WEBHOOK_URLS مع ترويسة Idempotency-Key
+
+البريد والـ webhook قد يُرسلان أكثر من مرة عند إعادة المحاولة، لذلك يحملان
+معرف الحدث ليتمكن المستقبل من تجاهل التكرار.
+
+لكل shard صندوق صادر خاص به (يُكتب مع صف المستخدم في نفس قاعدة البيانات)،
+والعمال يمرون على كل الـ shards.
+"""
+
+from email.message import EmailMessage
+import asyncio
+import json
+import logging
+import os
+import smtplib
+import socket
+import time
+import urllib.request
+
+from app import crud
+from app.core.config import settings
+from app.core.outbox import outbox_registry
+from app.core.suggest import suggest_index
+from app.database import shard_of, shard_session_factories
+
+logger = logging.getLogger(__name__)
+
+
+def event_key(db, event_id: int) -> str:
+    """
+    معرف الحدث الفريد عبر الـ shards (معرفات صندوق الصادر محلية لكل shard)
+    """
+    shard = shard_of(db)
+    return f"outbox-{event_id}" if shard == 0 else f"outbox-{shard}-{event_id}"
+
+
+# ======================
+# المعالجات
+# ======================
+@outbox_registry.register("user.registered", "stats")
+def update_registration_stats(db, event_id: int, payload: dict):
+    crud.StatsCRUD.increment_total_users(db)
+
+
+@outbox_registry.register("user.registered", "email")
+def send_registration_email(db, event_id: int, payload: dict):
+    message = EmailMessage()
+    message["Subject"] = "تم استلام طلب التسجيل"
+    message["From"] = settings.SMTP_SENDER
+    message["To"] = payload["email"]
+    message["Message-ID"] = f"<{event_key(db, event_id)}@{settings.SMTP_SENDER.split('@')[-1]}>"
+    message.set_content(
+        f"مرحباً {payload['name']}،\n\n"
+        f"تم استلام طلبك برقم USER-{payload['id']:06d}.\n"
+        "سيتم مراجعة طلبك من قبل الإدارة خلال 24-48 ساعة.\n"
+    )
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=10) as smtp:
+        smtp.send_message(message)
+
+
+@outbox_registry.register("user.registered", "webhook")
+def post_registration_webhook(db, event_id: int, payload: dict):
+    body = json.dumps(
+        {"event": "user.registered", "data": payload}, ensure_ascii=False
+    ).encode("utf-8")
+    for url in settings.WEBHOOK_URLS:
+        request = urllib.request.Request(
+            url,
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "Idempotency-Key": event_key(db, event_id),
+            },
+        )
+        with urllib.request.urlopen(request, timeout=settings.WEBHOOK_TIMEOUT_SECONDS) as response:
+            response.read()
+
+
+# ======================
+# معالجة الدفعات
+# ======================
+def process_batch(worker: str, batch_size: int = None, shard: int = 0) -> int:
+    """
+    حجز دفعة من أحداث الـ shard وتنفيذ معالجاتها، وإرجاع عدد الأحداث المحجوزة
+    """
+    db = shard_session_factories[shard]()
+    try:
+        lease_seconds = settings.OUTBOX_LEASE_SECONDS
+        renewed_at = time.monotonic()
+        events = crud.OutboxCRUD.claim_batch(
+            db,
+            worker,
+            batch_size or settings.OUTBOX_BATCH_SIZE,
+            lease_seconds
+        )
+        held = {event.id for event in events}
+        for position, event in enumerate(events):
+            # تجديد حجز بقية الدفعة بعد مرور نصف المهلة فقط، فيبقى لكل معالج
+            # نصف مهلة على الأقل دون جملة UPDATE قبل كل حدث
+            if time.monotonic() - renewed_at >= lease_seconds / 2:
+                held &= crud.OutboxCRUD.renew_leases(
+                    db,
+                    [remaining.id for remaining in events[position:] if remaining.id in held],
+                    worker,
+                    lease_seconds
+                )
+                renewed_at = time.monotonic()
+            if event.id not in held:
+                logger.warning(f"⚠️ انتهى حجز الحدث {event.id} قبل معالجته لدى العامل {worker}")
+                continue
+            handler = outbox_registry.get(event.handler)
+            try:
+                if handler is None:
+                    raise LookupError(f"معالج غير مسجل: {event.handler}")
+                handler(db, event.id, json.loads(event.payload))
+                
+                if crud.OutboxCRUD.mark_done(db, event.id, worker):
+                    db.commit()
+                else:
+                    # انتهت مهلة الحجز وأصبح الحدث لعامل آخر
+                    db.rollback()
+                    logger.warning(f"⚠️ فقد العامل {worker} حجز الحدث {event.id}")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"❌ فشل معالج {event.handler} للحدث {event.id}: {e}")
+                crud.OutboxCRUD.mark_failed(
+                    db,
+                    event.id,
+                    worker,
+                    event.attempts,
+                    f"{type(e).__name__}: {e}",
+                    settings.OUTBOX_MAX_ATTEMPTS,
+                    settings.OUTBOX_BACKOFF_SECONDS,
+                    settings.OUTBOX_MAX_BACKOFF_SECONDS
+                )
+        return len(events)
+    finally:
+        db.close()
+
+
+class OutboxWorkerPool:
+    """
+    مجموعة عمال asyncio؛ كل عامل ينفذ الدفعات في خيط منفصل (asyncio.to_thread)
+    """
+    
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._tasks = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+    
+    def start(self):
+        for number in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._run(f"{self._prefix}:{number}")))
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _run(self, worker: str):
+        batch_size = settings.OUTBOX_BATCH_SIZE
+        while True:
+            full = False
+            for shard in range(len(shard_session_factories)):
+                try:
+                    claimed = await asyncio.to_thread(process_batch, worker, batch_size, shard)
+                except Exception as e:
+                    logger.error(f"❌ خطأ في عامل صندوق الصادر {worker} (shard {shard}): {e}")
+                    claimed = 0
+                full = full or claimed >= batch_size
+            # دفعة ممتلئة تعني وجود المزيد، فلا انتظار
+            if not full:
+                await asyncio.sleep(self.poll_seconds)
+
+
+outbox_pool = OutboxWorkerPool(settings.OUTBOX_WORKERS, settings.OUTBOX_POLL_SECONDS)
+
+
+# ======================
+# الأرشفة الدورية
+# ======================
+def run_archive(older_than_days: int = None, chunk_size: int = None) -> int:
+    """
+    نقل الصفوف المستحقة إلى users_archive (في كل shard) وإرجاع عددها
+    """
+    archived = 0
+    for session_factory in shard_session_factories:
+        db = session_factory()
+        try:
+            archived += crud.ArchiveCRUD.archive(
+                db,
+                settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days,
+                chunk_size or settings.ARCHIVE_CHUNK_SIZE
+            )
+        finally:
+            db.close()
+    return archived
+
+
+class ArchiveScheduler:
+    """
+    مهمة asyncio تشغّل الأرشفة كل interval_seconds (في خيط منفصل)
+    """
+    
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._task = None
+    
+    def start(self):
+        if self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                archived = await asyncio.to_thread(run_archive)
+                if archived:
+                    logger.info(f"🗄️ تمت أرشفة {archived} مستخدم")
+            except Exception as e:
+                logger.error(f"❌ خطأ في أرشفة المستخدمين: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+archive_scheduler = ArchiveScheduler(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+# ======================
+# فهرس الإكمال التلقائي
+# ======================
+def rebuild_suggest_index() -> float:
+    """
+    إعادة بناء فهرس الإكمال من كل الـ shards وإرجاع مدة البناء بالثواني
+    """
+    return suggest_index.rebuild(crud.ShardCRUD.suggest_rows(settings.SUGGEST_LOAD_CHUNK_SIZE))
+
+
+async def load_suggest_index():
+    """
+    بناء الفهرس عند بدء التطبيق في خيط منفصل (الطلبات تُخدم أثناء البناء)
+    """
+    try:
+        seconds = await asyncio.to_thread(rebuild_suggest_index)
+        stats = suggest_index.stats()
+        logger.info(
+            f"🔎 تم بناء فهرس الإكمال: {stats['users']} مستخدم، {stats['keys']} مفتاح، "
+            f"{stats['memory_bytes'] / 1024 / 1024:.1f} MiB في {seconds:.2f} ثانية"
+        )
+    except Exception as e:
+        logger.error(f"❌ خطأ في بناء فهرس الإكمال: {e}")
@@ -0,0 +1,119 @@
+# scripts/bench_list_projection.py
+"""
+قياس الذاكرة والمعالج لقائمة المستخدمين: كائنات ORM مقابل select للأعمدة فقط
+
+يستخدم قاعدة SQLite مؤقتة في الذاكرة ولا يلمس قاعدة البيانات الفعلية.
+
+الاستخدام:
+    python scripts/bench_list_projection.py
+    python scripts/bench_list_projection.py --sizes 1000 10000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models
+from app.database import Base
+
+LIST_FIELDS = ("id", "name", "email", "phone", "status", "is_active", "created_at")
+
+
+def orm_page(db, size):
+    """
+    المسار القديم: كائنات User كاملة ثم نسخ الحقول في حلقة
+    """
+    users = crud.UserCRUD.get_all_users(db, skip=0, limit=size)
+    users_list = []
+    for user in users:
+        users_list.append({
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "phone": user.phone,
+            "status": user.status,
+            "is_active": user.is_active,
+            "created_at": user.created_at.isoformat() if user.created_at else None
+        })
+    return users_list
+
+
+def core_page(db, size, fields=LIST_FIELDS):
+    """
+    المسار الجديد: select للأعمدة المطلوبة ثم تحويل مباشر
+    """
+    rows = crud.UserCRUD.list_rows(db, fields, skip=0, limit=size)
+    return crud.UserCRUD.serialize_rows(fields, rows)
+
+
+def measure(session_factory, page, size, repeat):
+    timings = []
+    for _ in range(repeat):
+        db = session_factory()
+        start = time.perf_counter()
+        page(db, size)
+        timings.append(time.perf_counter() - start)
+        db.close()
+    
+    db = session_factory()
+    tracemalloc.start()
+    page(db, size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.close()
+    return min(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    total = max(args.sizes)
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {
+                "name": f"مستخدم تجريبي {i}",
+                "email": f"user{i}@example.com",
+                "phone": f"05{i:08d}",
+                "is_active": True,
+                "status": ("pending", "approved", "rejected")[i % 3],
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(total)
+        ])
+    
+    paths = [
+        ("ORM (قبل)", orm_page),
+        ("Core (بعد)", core_page),
+        ("Core fields=id,name,status", lambda db, size: core_page(db, size, ("id", "name", "status"))),
+    ]
+    print(f"{'rows':>6}  {'path':<28} {'time ms':>9} {'peak KiB':>10}")
+    for size in args.sizes:
+        for label, page in paths:
+            seconds, peak = measure(session_factory, page, size, args.repeat)
+            print(f"{size:>6}  {label:<28} {seconds * 1000:>9.1f} {peak / 1024:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# scripts/bench_suggest_index.py
+"""
+قياس فهرس الإكمال التلقائي: مدة إعادة البناء والذاكرة وزمن الاقتراح
+
+يبني الفهرس من أسماء عربية ولاتينية مولّدة في الذاكرة (بدون قاعدة بيانات).
+
+الاستخدام:
+    python scripts/bench_suggest_index.py
+    python scripts/bench_suggest_index.py --sizes 10000 100000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.suggest import SuggestIndex
+
+FIRST_NAMES = [
+    "محمد", "أحمد", "عبدالله", "فاطمة", "عائشة", "خالد", "إبراهيم", "مريم", "يوسف", "نورة",
+    "عمر", "سارة", "علي", "هدى", "مصطفى", "ليلى", "حسن", "آمنة", "سلمى", "طارق",
+]
+FAMILY_NAMES = [
+    "العتيبي", "القحطاني", "الشمري", "الحربي", "الزهراني", "الغامدي", "المطيري", "الدوسري",
+    "السبيعي", "العنزي", "الأنصاري", "الهاشمي", "البلوشي", "الرشيدي", "المالكي",
+]
+LATIN = ["john", "sara", "omar", "lina", "adam", "maya", "noor", "sami", "rana", "zaid"]
+QUERIES = ["م", "مح", "محمد", "احمد ال", "عبد", "فاطمه", "ابراهيم الش", "ال", "jo", "omar.", "sa", "z"]
+
+
+def generate(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    for user_id in range(1, size + 1):
+        name = (f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} "
+                f"{rng.choice(FAMILY_NAMES)}")
+        email = f"{rng.choice(LATIN)}.{rng.choice(LATIN)}{user_id}@example.com"
+        yield user_id, name, email, ("pending", "approved", "rejected")[user_id % 3]
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+    
+    print(f"{'users':>8} {'keys':>9} {'rebuild s':>10} {'MiB':>8} "
+          f"{'p50 us':>8} {'p99 us':>8} {'max us':>8} {'insert us':>10}")
+    for size in args.sizes:
+        index = SuggestIndex()
+        seconds = index.rebuild(generate(size))
+        stats = index.stats()
+        
+        rng = random.Random(1)
+        timings = []
+        for _ in range(args.queries):
+            query = rng.choice(QUERIES)
+            started = time.perf_counter()
+            index.suggest(query, args.limit)
+            timings.append((time.perf_counter() - started) * 1e6)
+        
+        started = time.perf_counter()
+        for user_id, name, email, status in generate(1000, seed=99):
+            index.add(size + user_id, name, email, status)
+        insert_us = (time.perf_counter() - started) * 1e6 / 1000
+        
+        print(f"{size:>8} {stats['keys']:>9} {seconds:>10.2f} "
+              f"{stats['memory_bytes'] / 1024 / 1024:>8.1f} "
+              f"{percentile(timings, 0.5):>8.0f} {percentile(timings, 0.99):>8.0f} "
+              f"{max(timings):>8.0f} {insert_us:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())